@@ -0,0 +1,391 @@
+"""Answer and metadata caches: bounded in-process LRU+TTL and a shared on-disk backend."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import Settings
+
+T = TypeVar("T")
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the deep memory footprint of ``value`` in bytes."""
+    seen: set[int] = set()
+    stack = [value]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, (str, bytes, bytearray, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            stack.append(vars(item))
+        else:
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+class CacheBackend(ABC):
+    """Key/value store with per-entry expiry used behind ``question_cache``."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or ``None`` when missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key``."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss style counters for monitoring."""
+
+
+class BoundedTTLCache(CacheBackend):
+    """Thread-safe LRU cache whose entries expire after ``ttl_seconds``.
+
+    ``max_entries`` and ``max_bytes`` bound the cache; when either is exceeded
+    the least recently used entries are evicted. Entry sizes come from
+    ``sizeof`` (``estimate_size`` by default). Expired entries are dropped on
+    access and swept in bulk at most once per TTL window.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ) -> None:
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._store: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _pop(self, key: str) -> None:
+        _, size, _ = self._store.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            record = self._store.get(key)
+            if record is None:
+                self.misses += 1
+                return None
+            expires_at, _, value = record
+            if time.monotonic() >= expires_at:
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._store.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._store:
+                self._pop(key)
+            now = time.monotonic()
+            if now - self._last_sweep >= self.ttl:
+                self._sweep(now)
+            if self.max_bytes is not None and size > self.max_bytes:
+                self.evictions += 1
+                return
+            self._store[key] = (now + self.ttl, size, value)
+            self._bytes += size
+            while self._over_limit():
+                _, (_, evicted_size, _) = self._store.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _over_limit(self) -> bool:
+        if self.max_entries is not None and len(self._store) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _sweep(self, now: float) -> None:
+        expired = [key for key, (expires_at, _, _) in self._store.items() if now >= expires_at]
+        for key in expired:
+            self._pop(key)
+        self.expirations += len(expired)
+        self._last_sweep = now
+
+    def sweep(self) -> int:
+        """Drop every expired entry and return how many were removed."""
+        with self._lock:
+            before = self.expirations
+            self._sweep(time.monotonic())
+            return self.expirations - before
+
+    def clear(self) -> None:
+        with self._lock:
+            self._store.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._store),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """Disk-backed cache shared by every worker process pointing at ``path``.
+
+    Values are encoded with ``jsonable_encoder``, as FastAPI encodes responses,
+    so a hit returns the same JSON types as a fresh answer; they are stored
+    zlib-compressed with an absolute expiry. SQLite's file locking (in WAL mode) makes concurrent
+    readers and writers from several processes safe. Once ``max_entries`` is
+    exceeded the oldest entries are deleted.
+    """
+
+    _SWEEP_EVERY = 64
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: Optional[int] = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS answers_created ON answers (created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _digest(key: str) -> str:
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connection().execute(
+            "SELECT payload, expires_at FROM answers WHERE key = ?", (self._digest(key),)
+        ).fetchone()
+        with self._lock:
+            if row is None or row[1] <= time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        payload = zlib.compress(json.dumps(jsonable_encoder(value)).encode("utf-8"))
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO answers (key, payload, expires_at, created_at) VALUES (?, ?, ?, ?)",
+            (self._digest(key), payload, now + self.ttl, now),
+        )
+        with self._lock:
+            self._writes += 1
+            sweep = self._writes % self._SWEEP_EVERY == 0
+        if sweep:
+            self._sweep(connection, now)
+
+    def _sweep(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute("DELETE FROM answers WHERE expires_at <= ?", (now,))
+        if self.max_entries is not None:
+            connection.execute(
+                "DELETE FROM answers WHERE key IN ("
+                "SELECT key FROM answers ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def sweep(self) -> None:
+        self._sweep(self._connection(), time.time())
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM answers")
+
+    def stats(self) -> Dict[str, int]:
+        (entries,) = self._connection().execute("SELECT COUNT(*) FROM answers").fetchone()
+        with self._lock:
+            return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+class _LeaderCancelled(Exception):
+    """Raised to followers when the call they were waiting on was cancelled."""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key so only the first one runs.
+
+    Later callers block (``do``) or await (``ado``) the first caller's result
+    or exception. Calls are tracked with ``concurrent.futures.Future`` so
+    threads and asyncio tasks on any event loop can wait on the same flight.
+    If the leading async call is cancelled, waiting callers start a new flight
+    instead of inheriting the cancellation.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, "Future[Any]"] = {}
+
+    def _claim(self, key: str) -> Tuple["Future[Any]", bool]:
+        with self._lock:
+            flight = self._calls.get(key)
+            if flight is not None:
+                return flight, False
+            flight = Future()
+            self._calls[key] = flight
+            return flight, True
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        while True:
+            flight, leader = self._claim(key)
+            if leader:
+                break
+            try:
+                return flight.result()
+            except _LeaderCancelled:
+                continue
+        try:
+            result = func()
+        except BaseException as exc:
+            self._release(key)
+            flight.set_exception(exc)
+            raise
+        self._release(key)
+        flight.set_result(result)
+        return result
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight, leader = self._claim(key)
+            if leader:
+                break
+            try:
+                return await asyncio.shield(asyncio.wrap_future(flight))
+            except _LeaderCancelled:
+                continue
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._release(key)
+            flight.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as exc:
+            self._release(key)
+            flight.set_exception(exc)
+            raise
+        self._release(key)
+        flight.set_result(result)
+        return result
+
+
+def build_answer_cache(settings: Settings) -> CacheBackend:
+    """Create the ``question_cache`` backend selected by ``ANSWER_CACHE_BACKEND``."""
+    backend = settings.answer_cache_backend.lower()
+    if backend == "memory":
+        return BoundedTTLCache(
+            ttl_seconds=settings.question_cache_ttl_seconds,
+            max_entries=settings.question_cache_max_entries,
+            max_bytes=settings.question_cache_max_bytes,
+        )
+    if backend == "sqlite":
+        return SQLiteCacheBackend(
+            settings.answer_cache_path,
+            ttl_seconds=settings.question_cache_ttl_seconds,
+            max_entries=settings.question_cache_max_entries,
+        )
+    raise ValueError(f"Unsupported answer cache backend: {backend}")
+
+
+def build_query_store(settings: Settings) -> CacheBackend:
+    """Create the store mapping ``query_id`` to final SQL for ``/query/{id}/export``.
+
+    It uses the same backend as the answer cache (so ids resolve on any worker
+    when that is ``sqlite``) but keeps entries far longer than answers.
+    """
+    backend = settings.answer_cache_backend.lower()
+    if backend == "memory":
+        return BoundedTTLCache(
+            ttl_seconds=settings.query_store_ttl_seconds,
+            max_entries=settings.query_store_max_entries,
+        )
+    if backend == "sqlite":
+        return SQLiteCacheBackend(
+            settings.query_store_path,
+            ttl_seconds=settings.query_store_ttl_seconds,
+            max_entries=settings.query_store_max_entries,
+        )
+    raise ValueError(f"Unsupported answer cache backend: {backend}")
+
+
+__all__ = [
+    "CacheBackend",
+    "BoundedTTLCache",
+    "SQLiteCacheBackend",
+    "SingleFlight",
+    "build_answer_cache",
+    "build_query_store",
+    "estimate_size",
+]
@@ -22,15 +22,49 @@ class Settings(BaseSettings):
 
     max_rows: int = Field(500, alias="MAX_ROWS")
     chart_engine: str = Field("matplotlib", alias="CHART_ENGINE")
+    render_workers: int = 2
+    render_timeout: float = 20.0
+    render_cache_ttl_seconds: int = 3600
+    render_cache_max_entries: int = 256
+    render_cache_max_bytes: int = 32 * 1024 * 1024
     allowed_statements: str = Field("SELECT_ONLY", alias="ALLOWED_STATEMENTS")
     openai_api_key: str | None = Field(None, alias="OPENAI_API_KEY")
     anthropic_api_key: str | None = Field(None, alias="ANTHROPIC_API_KEY")
 
     cache_ttl_seconds: int = 600
+    metadata_snapshot_path: str = ""
     question_cache_ttl_seconds: int = 120
+    question_cache_max_entries: int = 512
+    question_cache_max_bytes: int = 64 * 1024 * 1024
+    answer_cache_backend: str = "memory"
+    answer_cache_path: str = "cache/answers.sqlite3"
+    query_store_ttl_seconds: int = 86400
+    query_store_max_entries: int = 10_000
+    query_store_path: str = "cache/queries.sqlite3"
+    plan_cache_ttl_seconds: int = 3600
+    plan_cache_max_entries: int = 1024
+    plan_cache_embedder: str = "none"
+    plan_cache_similarity_threshold: float = 0.9
 
     llm_timeout: int = 30
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry: float = 60.0
+    llm_http2: bool = False
+    llm_stream: bool = True
     sql_timeout: int = 90
+    sql_validation_mode: str = "hybrid"
+    sql_result_format: str = "arrow"
+    export_max_rows: int = 1_000_000
+    export_batch_rows: int = 50_000
+
+    sql_pool_min_size: int = 1
+    sql_pool_max_size: int = 8
+    sql_pool_idle_seconds: int = 300
+    sql_pool_max_age_seconds: int = 3600
+    sql_pool_validate_after_seconds: int = 30
+    sql_pool_acquire_timeout: int = 30
+    sql_max_concurrency: int = 16
 
     feedback_path: str = "feedback/events.jsonl"
 
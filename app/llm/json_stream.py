@@ -0,0 +1,81 @@
+"""Incremental extraction of the first JSON object from streamed model output."""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Optional
+
+
+class JSONObjectExtractor:
+    """Finds the first complete top-level JSON object in text fed chunk by chunk.
+
+    Prose, markdown fences, or anything else around the object is ignored, so
+    ``Here is the query: ```json {...}``` `` parses the same as ``{...}``. A
+    brace-balanced span that is not valid JSON (``{region}`` in prose) is
+    skipped and scanning resumes just after its opening brace.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self.value: Optional[Dict[str, Any]] = None
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Add ``chunk``; return the object as soon as its closing brace arrives."""
+        if self.value is not None:
+            return self.value
+        self.text += chunk
+        text = self.text
+        i = self._pos
+        while i < len(text):
+            char = text[i]
+            i += 1
+            if self._start is None:
+                if char == "{":
+                    self._start, self._depth = i - 1, 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    start, self._start = self._start, None
+                    try:
+                        value = json.loads(text[start:i])
+                    except json.JSONDecodeError:
+                        i = start + 1
+                        continue
+                    self._pos = i
+                    self.value = value
+                    return value
+        self._pos = i
+        return None
+
+    def finish(self) -> Dict[str, Any]:
+        """Return the extracted object, raising ``JSONDecodeError`` if the text never contained one."""
+        if self.value is None:
+            raise json.JSONDecodeError("No JSON object found in model output", self.text, 0)
+        return self.value
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """Parse the first JSON object embedded in ``text``."""
+    extractor = JSONObjectExtractor()
+    extractor.feed(text)
+    return extractor.finish()
+
+
+__all__ = ["JSONObjectExtractor", "extract_json"]
@@ -0,0 +1,213 @@
+"""Plan-level cache that reuses generated SQL for repeated or paraphrased questions."""
+from __future__ import annotations
+
+import hashlib
+import importlib
+import re
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import TYPE_CHECKING, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.cache import BoundedTTLCache
+from app.config import get_settings
+from app.schema.ranking import normalize_token
+
+if TYPE_CHECKING:
+    from app.llm.planner import PlanResult
+
+# Filler words dropped before embedding; directional and comparative words are kept.
+STOPWORDS = {
+    "a", "all", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "each", "for",
+    "get", "give", "how", "i", "in", "is", "it", "list", "me", "of", "on", "per", "please", "show", "tell",
+    "that", "the", "their", "there", "us", "was", "we", "were", "what", "which", "with", "you",
+}
+
+# Words whose neighbours carry meaning through their order ("from A to B", "A higher than B").
+RELATION_WORDS = {
+    "above", "after", "before", "below", "between", "from", "into", "over", "than", "to", "under", "versus", "vs",
+}
+
+
+def normalize_question(question: str) -> str:
+    """Exact-match key: case, whitespace and punctuation folded, word order kept.
+
+    "Shipments from Boston to Denver?" -> "shipments from boston to denver".
+    Paraphrases are left to the optional embedder.
+    """
+    return " ".join(re.findall(r"[a-z0-9]+", question.lower()))
+
+
+def question_tokens(question: str) -> List[str]:
+    """Content words with simple plurals folded, used as the embedder's input."""
+    return [normalize_token(token) for token in normalize_question(question).split() if token not in STOPWORDS]
+
+
+def question_relations(tokens: Sequence[str]) -> FrozenSet[Tuple[str, str, str]]:
+    """``(left, word, right)`` around each relation word; a similarity hit must match these exactly.
+
+    Bag-of-words embeddings score "from Denver to Boston" and "from Boston to
+    Denver" as identical, so word order around these words is checked separately.
+    """
+    padded = ["", *tokens, ""]
+    return frozenset(
+        (padded[index - 1], token, padded[index + 1])
+        for index, token in enumerate(padded)
+        if token in RELATION_WORDS
+    )
+
+
+class Embedder(ABC):
+    """CPU-only text embedder used for similarity lookups in :class:`PlanCache`."""
+
+    @abstractmethod
+    def embed(self, text: str) -> Sequence[float]:
+        """Return a fixed-length vector for ``text``."""
+
+
+class HashingEmbedder(Embedder):
+    """Dependency-free bag-of-words embedding using feature hashing."""
+
+    def __init__(self, dimensions: int = 512) -> None:
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> Sequence[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in text.split():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+
+def load_embedder(name: str) -> Optional[Embedder]:
+    """Resolve ``PLAN_CACHE_EMBEDDER``: ``none``, ``hashing`` or ``package.module:ClassName``."""
+    if not name or name.lower() == "none":
+        return None
+    if name.lower() == "hashing":
+        return HashingEmbedder()
+    module_name, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"Unsupported plan cache embedder: {name}")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+class PlanCache:
+    """Caches :class:`PlanResult` by normalized question for one metadata version.
+
+    Exact matches on the normalized question are served from a bounded TTL
+    cache. With an embedder configured, misses fall back to the most similar
+    cached question whose cosine similarity reaches ``threshold`` and whose
+    :func:`question_relations` are the same. Everything
+    is dropped when the Unity Catalog metadata version changes.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        embedder: Optional[Embedder] = None,
+        threshold: float = 0.9,
+    ) -> None:
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._plans = BoundedTTLCache(ttl_seconds, max_entries=max_entries)
+        self._keys: List[str] = []
+        self._relations: List[FrozenSet[Tuple[str, str, str]]] = []
+        self._vectors: Optional[np.ndarray] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(normalized: str, top_k: int) -> str:
+        return f"{top_k}|{normalized}"
+
+    def _reset(self, version: Optional[str]) -> None:
+        self._plans.clear()
+        self._keys = []
+        self._relations = []
+        self._vectors = None
+        self._version = version
+
+    def _check_version(self, version: Optional[str]) -> None:
+        if version != self._version:
+            self._reset(version)
+
+    def _embed(self, tokens: Sequence[str]) -> np.ndarray:
+        text = " ".join(tokens)
+        vector = np.asarray(self.embedder.embed(text), dtype=np.float32)  # type: ignore[union-attr]
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _similar(self, question: str, top_k: int) -> Tuple[Optional[str], float]:
+        if self._vectors is None or not self._keys:
+            return None, 0.0
+        tokens = question_tokens(question)
+        relations = question_relations(tokens)
+        scores = self._vectors @ self._embed(tokens)
+        prefix = f"{top_k}|"
+        for index in np.argsort(-scores):
+            if scores[index] < self.threshold:
+                break
+            if self._keys[index].startswith(prefix) and self._relations[index] == relations:
+                return self._keys[index], float(scores[index])
+        return None, 0.0
+
+    def get(self, question: str, top_k: int, version: Optional[str]) -> Optional["PlanResult"]:
+        normalized = normalize_question(question)
+        with self._lock:
+            self._check_version(version)
+            plan = self._plans.get(self._key(normalized, top_k))
+            if plan is not None or self.embedder is None:
+                return plan
+            key, _ = self._similar(question, top_k)
+            return self._plans.get(key) if key else None
+
+    def set(self, question: str, top_k: int, version: Optional[str], plan: "PlanResult") -> None:
+        normalized = normalize_question(question)
+        key = self._key(normalized, top_k)
+        with self._lock:
+            self._check_version(version)
+            self._plans.set(key, plan)
+            if self.embedder is None or key in self._keys:
+                return
+            tokens = question_tokens(question)
+            vector = self._embed(tokens)[np.newaxis, :]
+            self._keys.append(key)
+            self._relations.append(question_relations(tokens))
+            self._vectors = vector if self._vectors is None else np.vstack([self._vectors, vector])
+            if len(self._keys) > self.max_entries:
+                # Keep the similarity index aligned with what the bounded cache can still hold.
+                self._keys = self._keys[-self.max_entries:]
+                self._relations = self._relations[-self.max_entries:]
+                self._vectors = self._vectors[-self.max_entries:]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(None)
+
+
+@lru_cache()
+def get_plan_cache() -> PlanCache:
+    settings = get_settings()
+    return PlanCache(
+        ttl_seconds=settings.plan_cache_ttl_seconds,
+        max_entries=settings.plan_cache_max_entries,
+        embedder=load_embedder(settings.plan_cache_embedder),
+        threshold=settings.plan_cache_similarity_threshold,
+    )
+
+
+__all__ = [
+    "Embedder",
+    "HashingEmbedder",
+    "PlanCache",
+    "get_plan_cache",
+    "load_embedder",
+    "normalize_question",
+    "question_relations",
+    "question_tokens",
+]
@@ -1,15 +1,17 @@
 """Planner that converts natural language questions into SQL."""
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
-from typing import List
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Tuple
+
+from starlette.concurrency import run_in_threadpool
 
 from app.config import get_settings
+from app.llm.plan_cache import PlanCache, get_plan_cache
 from app.llm.prompts import planner_prompt
 from app.llm.provider import LLMProvider
 from app.schema.resolver import resolve_synonyms, surface_relevant_columns
-from app.schema.unity import UnityCatalogClient, build_condensed_context
+from app.schema.unity import Table, UnityCatalogClient, build_condensed_context
 
 
 @dataclass
@@ -22,10 +24,11 @@ class PlanResult:
 
 
 class NL2SQLPlanner:
-    def __init__(self, llm: LLMProvider, unity_client: UnityCatalogClient) -> None:
+    def __init__(self, llm: LLMProvider, unity_client: UnityCatalogClient, plan_cache: PlanCache | None = None) -> None:
         self.llm = llm
         self.unity_client = unity_client
         self.settings = get_settings()
+        self.plan_cache = plan_cache if plan_cache is not None else get_plan_cache()
 
     def _rules_text(self) -> str:
         return "\n".join(
@@ -38,11 +41,18 @@ class NL2SQLPlanner:
             ]
         )
 
-    def build_plan(self, question: str, top_k: int) -> PlanResult:
-        tables = self.unity_client.get_tables()
-        condensed = build_condensed_context(tables, question, top_k_tables=top_k, max_columns=50)
+    def _prepare(self, tables: List[Table], question: str, top_k: int) -> Tuple[Dict[str, Any], str, str]:
+        index = self.unity_client.get_index()
+        condensed = build_condensed_context(
+            tables,
+            question,
+            top_k_tables=top_k,
+            max_columns=50,
+            ranker=self.unity_client.get_ranker(),
+            relationships=self.unity_client.get_relationships(),
+        )
         synonyms = resolve_synonyms(question)
-        relevant_columns = surface_relevant_columns(question, tables)
+        relevant_columns = surface_relevant_columns(question, tables, index=index)
         if relevant_columns:
             column_lines = "\n".join(f"Hint: {table}.{column}" for table, column in relevant_columns)
             condensed_text = f"{condensed['text']}\n{column_lines}"
@@ -55,10 +65,9 @@ class NL2SQLPlanner:
             rules=self._rules_text(),
             max_rows=self.settings.max_rows,
         )
-        try:
-            response = self.llm.complete(prompt)
-        except json.JSONDecodeError:
-            response = self.llm.complete(prompt + "\nRespond ONLY with JSON.")
+        return condensed, condensed_text, prompt
+
+    def _to_plan(self, response: Any, condensed: Dict[str, Any], condensed_text: str) -> PlanResult:
         if not isinstance(response, dict) or "sql" not in response:
             raise ValueError("LLM response missing SQL")
         sql = response.get("sql", "").strip()
@@ -74,5 +83,29 @@ class NL2SQLPlanner:
             schema_context=condensed_text,
         )
 
+    def _metadata_version(self) -> str | None:
+        return getattr(self.unity_client, "version", None)
+
+    def remember(self, question: str, top_k: int, plan: PlanResult, sql: str, fields_used: List[str]) -> None:
+        """Cache a plan once its (possibly repaired) SQL has executed successfully."""
+        self.plan_cache.set(question, top_k, self._metadata_version(), replace(plan, sql=sql, fields_used=fields_used))
+
+    def build_plan(self, question: str, top_k: int) -> PlanResult:
+        tables = self.unity_client.get_tables()
+        cached = self.plan_cache.get(question, top_k, self._metadata_version())
+        if cached is not None:
+            return cached
+        condensed, condensed_text, prompt = self._prepare(tables, question, top_k)
+        response = self.llm.complete(prompt)
+        return self._to_plan(response, condensed, condensed_text)
+
+    async def abuild_plan(self, question: str, top_k: int) -> PlanResult:
+        tables = await run_in_threadpool(self.unity_client.get_tables)
+        cached = self.plan_cache.get(question, top_k, self._metadata_version())
+        if cached is not None:
+            return cached
+        condensed, condensed_text, prompt = await run_in_threadpool(self._prepare, tables, question, top_k)
+        response = await self.llm.acomplete(prompt)
+        return self._to_plan(response, condensed, condensed_text)
 
 __all__ = ["NL2SQLPlanner", "PlanResult"]
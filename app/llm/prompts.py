@@ -56,7 +56,7 @@ def planner_prompt(question: str, schema_context: str, synonyms: Dict[str, str],
 def repair_prompt(question: str, schema_context: str, error_message: str, previous_sql: str, max_rows: int) -> str:
     return dedent(
         f"""
-        The previous SQL failed with the following Databricks error:
+        The previous SQL failed with the following error:
         {error_message}
 
         Please revise the SQL while respecting all original constraints:
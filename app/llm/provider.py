@@ -1,13 +1,18 @@
 """LLM provider abstraction."""
 from __future__ import annotations
 
+import importlib.util
 import json
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
 import httpx
+from starlette.concurrency import run_in_threadpool
 
 from app.config import get_settings
+from app.llm.json_stream import JSONObjectExtractor, extract_json
 
 
 class LLMProvider(ABC):
@@ -15,17 +20,134 @@ class LLMProvider(ABC):
     def complete(self, prompt: str) -> Dict[str, Any]:
         """Return parsed JSON from the model."""
 
+    async def acomplete(self, prompt: str) -> Dict[str, Any]:
+        """Async variant of :meth:`complete`; runs the sync call in a worker thread by default."""
+        return await run_in_threadpool(self.complete, prompt)
+
+    def close(self) -> None:
+        """Release any resources held by the provider."""
+
+    async def aclose(self) -> None:
+        self.close()
+
+
+class HTTPLLMProvider(LLMProvider):
+    """Shared request/response plumbing for JSON-over-HTTP chat APIs.
+
+    Sync and async ``httpx`` clients are created on first use and kept for the
+    life of the process so connections stay alive between prompts. With
+    ``LLM_STREAM`` enabled, completions are streamed and returned as soon as
+    the first JSON object in the output is closed.
+    """
 
-class OpenAIProvider(LLMProvider):
     def __init__(self) -> None:
+        settings = get_settings()
+        self.timeout = settings.llm_timeout
+        self.stream = settings.llm_stream
+        self.limits = httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry,
+        )
+        # HTTP/2 needs the optional ``h2`` package (``pip install httpx[http2]``).
+        self.http2 = settings.llm_http2 and importlib.util.find_spec("h2") is not None
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        return self._client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        return self._async_client
+
+    @abstractmethod
+    def _build_request(self, prompt: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """Return ``(url, headers, payload)`` for a non-streaming completion of ``prompt``."""
+
+    @abstractmethod
+    def _extract_content(self, data: Dict[str, Any]) -> str:
+        """Model text from a complete response body."""
+
+    @abstractmethod
+    def _extract_delta(self, event: Dict[str, Any]) -> str:
+        """Text carried by one streamed event (empty for non-text events)."""
+
+    def _stream_request(self, prompt: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        url, headers, payload = self._build_request(prompt)
+        return url, headers, {**payload, "stream": True}
+
+    def _feed_line(self, extractor: JSONObjectExtractor, line: str) -> Optional[Dict[str, Any]]:
+        if not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if not data or data == "[DONE]":
+            return None
+        return extractor.feed(self._extract_delta(json.loads(data)))
+
+    def complete(self, prompt: str) -> Dict[str, Any]:
+        if not self.stream:
+            url, headers, payload = self._build_request(prompt)
+            response = self.client.post(url, headers=headers, json=payload)
+            response.raise_for_status()
+            return extract_json(self._extract_content(response.json()))
+        url, headers, payload = self._stream_request(prompt)
+        extractor = JSONObjectExtractor()
+        with self.client.stream("POST", url, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                # Leaving the block closes the stream, so generation stops once the object is complete.
+                if self._feed_line(extractor, line) is not None:
+                    break
+        return extractor.finish()
+
+    async def acomplete(self, prompt: str) -> Dict[str, Any]:
+        if not self.stream:
+            url, headers, payload = self._build_request(prompt)
+            response = await self.async_client.post(url, headers=headers, json=payload)
+            response.raise_for_status()
+            return extract_json(self._extract_content(response.json()))
+        url, headers, payload = self._stream_request(prompt)
+        extractor = JSONObjectExtractor()
+        async with self.async_client.stream("POST", url, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if self._feed_line(extractor, line) is not None:
+                    break
+        return extractor.finish()
+
+    def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        async_client, self._async_client = self._async_client, None
+        if async_client is not None:
+            await async_client.aclose()
+
+
+class OpenAIProvider(HTTPLLMProvider):
+    def __init__(self) -> None:
+        super().__init__()
         settings = get_settings()
         self.api_key = settings.openai_api_key
         if not self.api_key:
             raise RuntimeError("OPENAI_API_KEY is not configured")
         self.model = settings.llm_model
-        self.timeout = settings.llm_timeout
 
-    def complete(self, prompt: str) -> Dict[str, Any]:
+    def _build_request(self, prompt: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -38,24 +160,26 @@ class OpenAIProvider(LLMProvider):
             ],
             "temperature": 0.1,
         }
-        with httpx.Client(timeout=self.timeout) as client:
-            response = client.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        content = data["choices"][0]["message"]["content"]
-        return json.loads(content)
+        return "https://api.openai.com/v1/chat/completions", headers, payload
 
+    def _extract_content(self, data: Dict[str, Any]) -> str:
+        return data["choices"][0]["message"]["content"]
 
-class AnthropicProvider(LLMProvider):
+    def _extract_delta(self, event: Dict[str, Any]) -> str:
+        choices = event.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or ""
+
+
+class AnthropicProvider(HTTPLLMProvider):
     def __init__(self) -> None:
+        super().__init__()
         settings = get_settings()
         self.api_key = settings.anthropic_api_key
         if not self.api_key:
             raise RuntimeError("ANTHROPIC_API_KEY is not configured")
         self.model = settings.llm_model
-        self.timeout = settings.llm_timeout
 
-    def complete(self, prompt: str) -> Dict[str, Any]:
+    def _build_request(self, prompt: str) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
         headers = {
             "x-api-key": self.api_key,
             "anthropic-version": "2023-06-01",
@@ -68,15 +192,20 @@ class AnthropicProvider(LLMProvider):
             ],
             "temperature": 0.1,
         }
-        with httpx.Client(timeout=self.timeout) as client:
-            response = client.post("https://api.anthropic.com/v1/messages", headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        content = "".join(block.get("text", "") for block in data.get("content", []))
-        return json.loads(content)
+        return "https://api.anthropic.com/v1/messages", headers, payload
 
+    def _extract_content(self, data: Dict[str, Any]) -> str:
+        return "".join(block.get("text", "") for block in data.get("content", []))
 
+    def _extract_delta(self, event: Dict[str, Any]) -> str:
+        if event.get("type") != "content_block_delta":
+            return ""
+        return event.get("delta", {}).get("text", "")
+
+
+@lru_cache()
 def get_provider() -> LLMProvider:
+    """Return the process-wide provider for the configured LLM backend."""
     settings = get_settings()
     provider = settings.llm_provider.lower()
     if provider == "openai":
@@ -86,4 +215,11 @@ def get_provider() -> LLMProvider:
     raise ValueError(f"Unsupported LLM provider: {provider}")
 
 
-__all__ = ["LLMProvider", "OpenAIProvider", "AnthropicProvider", "get_provider"]
+async def close_provider() -> None:
+    """Close the shared provider's HTTP clients if one was created."""
+    if get_provider.cache_info().currsize:
+        await get_provider().aclose()
+        get_provider.cache_clear()
+
+
+__all__ = ["LLMProvider", "HTTPLLMProvider", "OpenAIProvider", "AnthropicProvider", "get_provider", "close_provider"]
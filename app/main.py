@@ -1,108 +1,196 @@
 """FastAPI application entry point."""
 from __future__ import annotations
 
+import asyncio
 import json
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Awaitable, Dict, Literal, Optional, Sequence, Tuple, TypeVar
 
-from fastapi import Depends, FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 
 from app.config import Settings, get_settings
 from app.llm.planner import NL2SQLPlanner
-from app.llm.provider import get_provider
-from app.models import AskRequest, AskResponse, FeedbackRequest, ForeignKey, LoggedAskEvent, SchemaColumn, SchemaResponse, SchemaTable
-from app.schema.unity import UnityCatalogClient, derive_pk_fk, get_synonyms
-from app.sql.executor import DatabricksExecutor
+from app.models import AskRequest, AskResponse, ExportFormat, FeedbackRequest, LoggedAskEvent, SchemaResponse
+from app.schema.serialize import choose_encoding, get_schema_serializer
+from app.schema.unity import UnityCatalogClient, get_synonyms
+from app.services import Services, build_services
+from app.sql.dbsql import dbsql
+from app.sql.executor import DatabricksExecutor, ExportFormatError, QueryTimeout
+from app.sql.export import EXPORT_MEDIA_TYPES
+from app.sql.pool import STATEMENT_ERRORS, PoolUnavailable, get_connection_pool
 from app.sql.repair import SQLRepairExecutor
+from app.sql.results import ColumnarRows, as_columns, as_row_dicts
 from app.utils import (
     extract_user_agent,
     format_answer_summary,
+    format_sse,
     log_ask_event,
     log_feedback_event,
+    logger,
+    query_id_for,
+    query_store,
     question_cache,
+    question_flights,
 )
+from app.viz.pool import RenderError
 from app.viz.render import ChartRenderer
 from app.viz.selector import select_chart
 
 
-app = FastAPI(title="Databricks NL2SQL")
+T = TypeVar("T")
+
+# Rows sent in the early ``rows`` event of /ask/stream, ahead of the full result.
+STREAM_PREVIEW_ROWS = 20
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    services = build_services()
+    # Startup does not complete (and the worker takes no traffic) until metadata is loaded.
+    await run_in_threadpool(services.warm_up)
+    app.state.services = services
+    try:
+        yield
+    finally:
+        await services.aclose()
+
+
+app = FastAPI(title="Databricks NL2SQL", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 
-def get_unity_client() -> UnityCatalogClient:
-    return UnityCatalogClient()
+def get_services(request: Request) -> Services:
+    return request.app.state.services
 
 
-def get_planner(unity_client: UnityCatalogClient = Depends(get_unity_client)) -> NL2SQLPlanner:
-    provider = get_provider()
-    return NL2SQLPlanner(provider, unity_client)
+def get_unity_client(services: Services = Depends(get_services)) -> UnityCatalogClient:
+    return services.unity_client
 
 
-def get_repair_executor(
-    planner: NL2SQLPlanner = Depends(get_planner),
-) -> SQLRepairExecutor:
-    provider = planner.llm
-    executor = DatabricksExecutor()
-    return SQLRepairExecutor(provider, executor)
+def get_planner(services: Services = Depends(get_services)) -> NL2SQLPlanner:
+    return services.planner
+
+
+def get_repair_executor(services: Services = Depends(get_services)) -> SQLRepairExecutor:
+    return services.repair_executor
+
+
+def get_chart_renderer(services: Services = Depends(get_services)) -> ChartRenderer:
+    return services.renderer
 
 
-def get_chart_renderer() -> ChartRenderer:
-    return ChartRenderer()
+def get_query_executor(services: Services = Depends(get_services)) -> DatabricksExecutor:
+    return services.repair_executor.executor
+
+
+@app.get("/status")
+def read_status(services: Services = Depends(get_services)) -> JSONResponse:
+    """Readiness probe: 503 until metadata has loaded, with metadata and pool details."""
+    body = {
+        "ready": services.ready,
+        "metadata": services.unity_client.status(),
+        "sql_pool": get_connection_pool().stats(),
+    }
+    return JSONResponse(body, status_code=200 if services.ready else 503)
 
 
 @app.get("/schema", response_model=SchemaResponse)
-def read_schema(unity_client: UnityCatalogClient = Depends(get_unity_client)) -> SchemaResponse:
-    tables = unity_client.get_tables()
-    response_tables = []
-    for table in tables:
-        derived = derive_pk_fk(table)
-        response_tables.append(
-            SchemaTable(
-                full_name=table.full_name,
-                columns=[SchemaColumn(name=col.name, type=col.type, comment=col.comment) for col in table.columns],
-                pk=derived["pk"],
-                fk=[
-                    ForeignKey(col=mapping.split("->", 1)[0], ref=mapping.split("->", 1)[1])
-                    for mapping in derived["fk"]
-                ],
-                comment=table.comment,
-            )
-        )
-    return SchemaResponse(tables=response_tables, synonyms=get_synonyms())
+def read_schema(
+    http_request: Request,
+    catalog: Optional[str] = None,
+    schema: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    format: Literal["json", "ndjson"] = "json",
+    unity_client: UnityCatalogClient = Depends(get_unity_client),
+) -> Response:
+    tables, version, relationships = unity_client.snapshot()
+    synonyms = get_synonyms()
+    serializer = get_schema_serializer()
+    # NDJSON is streamed uncompressed, so only JSON documents vary by encoding.
+    encoding = choose_encoding(http_request.headers.get("accept-encoding")) if format == "json" else "identity"
+    etag = serializer.etag(version, synonyms, catalog, schema, offset, limit, fmt=format, encoding=encoding)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if http_request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if format == "ndjson":
+        lines = serializer.ndjson(version, tables, relationships, catalog, schema, offset, limit)
+        return StreamingResponse(lines, media_type="application/x-ndjson", headers=headers)
+    document = serializer.document(version, tables, relationships, synonyms, catalog, schema, offset, limit)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=document.encode(encoding), media_type="application/json", headers=headers)
 
 
-@app.post("/ask", response_model=AskResponse)
-def ask_question(
+def _shape_rows(rows: Sequence[Dict[str, Any]], result_format: str, key: str = "sampled_rows") -> Dict[str, Any]:
+    """JSON form of a result: row objects under ``key``, or one array per column under ``columns``."""
+    if result_format == "columns":
+        return {key: [], "columns": as_columns(rows)}
+    return {key: as_row_dicts(rows)}
+
+
+async def _ask_stages(
     request: AskRequest,
     http_request: Request,
-    planner: NL2SQLPlanner = Depends(get_planner),
-    repair_executor: SQLRepairExecutor = Depends(get_repair_executor),
-    renderer: ChartRenderer = Depends(get_chart_renderer),
-) -> AskResponse:
-    cache_key = json.dumps(request.dict(), sort_keys=True)
-    cached = question_cache.get(cache_key)
-    if cached:
-        return AskResponse(**cached)
-    plan = planner.build_plan(request.question, request.top_k)
+    planner: NL2SQLPlanner,
+    repair_executor: SQLRepairExecutor,
+    renderer: ChartRenderer,
+    cache_key: str,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Run the /ask pipeline, yielding ``(stage, payload)`` as each step completes.
+
+    Stages are ``plan``, ``rows``, ``result`` and ``chart``; the final ``done``
+    stage carries the complete :class:`AskResponse`, which is also cached.
+    """
+    plan = await planner.abuild_plan(request.question, request.top_k)
+    yield "plan", {"sql": plan.sql, "tables_considered": plan.tables_considered, "assumptions": plan.assumptions}
     try:
-        final_sql, fields_used, rows = repair_executor.run(request.question, plan)
+        final_sql, fields_used, rows = await repair_executor.arun(request.question, plan)
     except RuntimeError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    planner.remember(request.question, request.top_k, plan, final_sql, fields_used)
+    query_id = query_id_for(final_sql)
+    await run_in_threadpool(query_store.set, query_id, {"sql": final_sql, "question": request.question})
+    truncated = getattr(rows, "truncated", False)
+    shaped = _shape_rows(rows, request.result_format)
+    yield "rows", {
+        "sql": final_sql,
+        **_shape_rows(rows[:STREAM_PREVIEW_ROWS], request.result_format, key="rows"),
+        "row_count": len(rows),
+        "truncated": truncated,
+    }
+    answer_text = format_answer_summary(request.question, rows, truncated)
+    yield "result", {
+        "answer_text": answer_text,
+        "sql": final_sql,
+        "fields_used": fields_used,
+        **shaped,
+        "truncated": truncated,
+        "query_id": query_id,
+    }
     chart_payload = None
     chart_choice = select_chart(rows, request.chart_preference)
     if chart_choice:
         chart_type, spec = chart_choice
-        image = renderer.render(chart_type, spec, rows, title=request.question)
-        chart_payload = {"type": chart_type, "spec": spec, "image_base64": image}
-    answer_text = format_answer_summary(request.question, rows)
+        try:
+            image = await renderer.arender(chart_type, spec, rows, title=request.question)
+        except RenderError:
+            logger.warning("Answering without a chart", exc_info=True)
+        else:
+            chart_payload = {"type": chart_type, "spec": spec, "image_base64": image}
+    yield "chart", chart_payload
     response = AskResponse(
         answer_text=answer_text,
         sql=final_sql,
         fields_used=fields_used,
-        sampled_rows=rows,
         chart=chart_payload,
+        truncated=truncated,
+        query_id=query_id,
+        **shaped,
     )
     event = LoggedAskEvent(
         timestamp=datetime.utcnow(),
@@ -115,8 +203,202 @@ def ask_question(
     payload = event.dict()
     payload["timestamp"] = event.timestamp.isoformat()
     log_ask_event(payload)
-    question_cache.set(cache_key, response.dict())
-    return response
+    await run_in_threadpool(question_cache.set, cache_key, response.dict())
+    yield "done", response
+
+
+async def _cached_stages(response: AskResponse) -> AsyncIterator[Tuple[str, Any]]:
+    """Replay a cached answer as the same stages ``_ask_stages`` produces."""
+    rows: Sequence[Dict[str, Any]] = response.sampled_rows
+    shaped: Dict[str, Any] = {"sampled_rows": rows}
+    if response.columns is not None:
+        rows = ColumnarRows(response.columns)
+        shaped["columns"] = response.columns
+    result_format = "columns" if response.columns is not None else "rows"
+    yield "plan", {"sql": response.sql, "tables_considered": [], "assumptions": ""}
+    yield "rows", {
+        "sql": response.sql,
+        **_shape_rows(rows[:STREAM_PREVIEW_ROWS], result_format, key="rows"),
+        "row_count": len(rows),
+        "truncated": response.truncated,
+    }
+    yield "result", {
+        "answer_text": response.answer_text,
+        "sql": response.sql,
+        "fields_used": response.fields_used,
+        **shaped,
+        "truncated": response.truncated,
+        "query_id": response.query_id,
+    }
+    yield "chart", response.chart.dict() if response.chart else None
+    yield "done", response
+
+
+async def _coalesced_stages(
+    request: AskRequest,
+    http_request: Request,
+    planner: NL2SQLPlanner,
+    repair_executor: SQLRepairExecutor,
+    renderer: ChartRenderer,
+    cache_key: str,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """``_ask_stages`` behind ``question_flights``: identical concurrent questions run the pipeline once.
+
+    The leading stream forwards stages as they complete; a stream that joins
+    an in-flight /ask or /ask/stream waits for its answer and replays it.
+    """
+    queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+
+    async def lead() -> AskResponse:
+        async for stage, payload in _ask_stages(request, http_request, planner, repair_executor, renderer, cache_key):
+            queue.put_nowait((stage, payload))
+            if stage == "done":
+                return payload
+        raise RuntimeError("Answer pipeline finished without a response.")
+
+    flight = asyncio.ensure_future(question_flights.ado(cache_key, lead))
+    try:
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, flight}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                stage, payload = getter.result()
+                yield stage, payload
+                if stage == "done":
+                    return
+                continue
+            getter.cancel()
+            if queue.empty():
+                break
+        async for stage, payload in _cached_stages(flight.result()):
+            yield stage, payload
+    finally:
+        flight.cancel()
+
+
+async def _answer_question(
+    request: AskRequest,
+    http_request: Request,
+    planner: NL2SQLPlanner,
+    repair_executor: SQLRepairExecutor,
+    renderer: ChartRenderer,
+    cache_key: str,
+) -> AskResponse:
+    async for stage, payload in _ask_stages(request, http_request, planner, repair_executor, renderer, cache_key):
+        if stage == "done":
+            return payload
+    raise RuntimeError("Answer pipeline finished without a response.")
+
+
+async def _cancel_on_disconnect(http_request: Request, awaitable: Awaitable[T]) -> T:
+    """Await ``awaitable``, cancelling it (and any warehouse statement it started) if the client disconnects."""
+    task = asyncio.ensure_future(awaitable)
+
+    async def watch() -> None:
+        while (await http_request.receive())["type"] != "http.disconnect":
+            pass
+        task.cancel()
+
+    watcher = asyncio.ensure_future(watch())
+    try:
+        return await task
+    finally:
+        watcher.cancel()
+
+
+async def _sse_events(stages: AsyncIterator[Tuple[str, Any]], cached: bool) -> AsyncIterator[str]:
+    try:
+        async for stage, payload in stages:
+            yield format_sse(stage, {"cached": cached} if stage == "done" else payload)
+    except HTTPException as exc:
+        yield format_sse("error", {"status_code": exc.status_code, "detail": exc.detail})
+    except Exception as exc:  # noqa: BLE001 - headers are already sent, so report in-band
+        logger.exception("Streaming /ask failed")
+        yield format_sse("error", {"status_code": 500, "detail": str(exc)})
+
+
+@app.post("/ask", response_model=AskResponse)
+async def ask_question(
+    request: AskRequest,
+    http_request: Request,
+    planner: NL2SQLPlanner = Depends(get_planner),
+    repair_executor: SQLRepairExecutor = Depends(get_repair_executor),
+    renderer: ChartRenderer = Depends(get_chart_renderer),
+) -> AskResponse:
+    cache_key = json.dumps(request.dict(), sort_keys=True)
+    cached = await run_in_threadpool(question_cache.get, cache_key)
+    if cached:
+        return AskResponse(**cached)
+    return await _cancel_on_disconnect(
+        http_request,
+        question_flights.ado(
+            cache_key,
+            lambda: _answer_question(request, http_request, planner, repair_executor, renderer, cache_key),
+        ),
+    )
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(
+    request: AskRequest,
+    http_request: Request,
+    planner: NL2SQLPlanner = Depends(get_planner),
+    repair_executor: SQLRepairExecutor = Depends(get_repair_executor),
+    renderer: ChartRenderer = Depends(get_chart_renderer),
+) -> StreamingResponse:
+    """Same pipeline as ``/ask``, emitted as server-sent events while each stage completes."""
+    cache_key = json.dumps(request.dict(), sort_keys=True)
+    cached = await run_in_threadpool(question_cache.get, cache_key)
+    if cached:
+        stages = _cached_stages(AskResponse(**cached))
+    else:
+        stages = _coalesced_stages(request, http_request, planner, repair_executor, renderer, cache_key)
+    return StreamingResponse(
+        _sse_events(stages, cached=bool(cached)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/query/{query_id}/export")
+async def export_query(
+    query_id: str,
+    format: ExportFormat = "csv",
+    limit: Optional[int] = Query(None, ge=1),
+    executor: DatabricksExecutor = Depends(get_query_executor),
+) -> StreamingResponse:
+    """Re-run an answered question's final SQL and stream the full result as CSV or Parquet.
+
+    Rows are capped at ``EXPORT_MAX_ROWS`` rather than ``MAX_ROWS`` and are
+    fetched and encoded in Arrow batches, so memory stays bounded.
+    """
+    stored = await run_in_threadpool(query_store.get, query_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired query_id: {query_id}")
+    chunks = executor.aexport(stored["sql"], format, limit)
+    try:
+        # Run the statement before sending headers so failures get a proper status.
+        first = await chunks.__anext__()
+    except QueryTimeout as exc:
+        raise HTTPException(status_code=504, detail=str(exc)) from exc
+    except PoolUnavailable as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    except (ExportFormatError, *STATEMENT_ERRORS) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except dbsql.Error as exc:  # type: ignore[attr-defined]
+        # Transport or session failures are the warehouse's fault, not the query's.
+        raise HTTPException(status_code=502, detail=f"Databricks warehouse error: {exc}") from exc
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    headers = {"Content-Disposition": f'attachment; filename="query-{query_id}.{format}"'}
+    return StreamingResponse(body(), media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
 
 
 @app.post("/feedback")
@@ -7,6 +7,8 @@ from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 ChartType = Literal["auto", "line", "bar", "pie", "scatter", "kpi"]
+ExportFormat = Literal["csv", "parquet"]
+ResultFormat = Literal["rows", "columns"]
 Verdict = Literal["good", "bad"]
 
 
@@ -14,6 +16,8 @@ class AskRequest(BaseModel):
     question: str
     chart_preference: ChartType = "auto"
     top_k: int = 12
+    # "columns" returns results as one array per column in ``columns`` instead of ``sampled_rows``.
+    result_format: ResultFormat = "rows"
 
 
 class ChartPayload(BaseModel):
@@ -28,6 +32,10 @@ class AskResponse(BaseModel):
     fields_used: List[str]
     sampled_rows: List[Dict[str, Any]]
     chart: Optional[ChartPayload]
+    truncated: bool = False
+    columns: Optional[Dict[str, List[Any]]] = None
+    # Pass to ``GET /query/{query_id}/export`` to download the full result.
+    query_id: Optional[str] = None
 
 
 class SchemaColumn(BaseModel):
@@ -52,6 +60,7 @@ class SchemaTable(BaseModel):
 class SchemaResponse(BaseModel):
     tables: List[SchemaTable]
     synonyms: Dict[str, str]
+    total: Optional[int] = None
 
 
 class FeedbackRequest(BaseModel):
@@ -0,0 +1,98 @@
+"""Token-level inverted index over Unity Catalog metadata."""
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Set, Tuple
+
+if TYPE_CHECKING:
+    from app.schema.unity import Table
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+MAX_IDENTIFIER_TOKENS = 6
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def normalize_token(token: str) -> str:
+    """Collapse simple plurals so ``vendors`` and ``vendor`` share a term."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def identifier_key(name: str) -> str:
+    """Canonical form of an identifier: ``Order-Items`` and ``order_items`` both map to ``order_items``."""
+    return "_".join(tokenize(name))
+
+
+def term_key(name: str) -> str:
+    """``identifier_key`` with plurals folded per token: ``Ticket_Categories`` -> ``ticket_category``."""
+    return "_".join(normalize_token(token) for token in tokenize(name))
+
+
+def question_keys(question: str, max_tokens: int = MAX_IDENTIFIER_TOKENS, fold_plurals: bool = False) -> Set[str]:
+    """Every run of up to ``max_tokens`` consecutive question tokens joined with ``_``."""
+    tokens = tokenize(question)
+    if fold_plurals:
+        tokens = [normalize_token(token) for token in tokens]
+    keys: Set[str] = set()
+    for start in range(len(tokens)):
+        for end in range(start + 1, min(start + max_tokens, len(tokens)) + 1):
+            keys.add("_".join(tokens[start:end]))
+    return keys
+
+
+class MetadataIndex:
+    """Inverted index from identifier and comment tokens to tables and columns.
+
+    Built once per metadata load. Lookups expand the question into token
+    n-grams and only touch the postings for those keys, so lookup cost scales
+    with the question rather than with the catalog. Index and question tokens
+    both have plurals folded, so "tickets" finds a ``ticket`` table. Table ranking lives in
+    :mod:`app.schema.ranking`.
+    """
+
+    def __init__(self, tables: Iterable["Table"]) -> None:
+        self.tables: List["Table"] = list(tables)
+        self.table_names: Dict[str, List[int]] = defaultdict(list)
+        self.schema_names: Dict[str, List[int]] = defaultdict(list)
+        self.column_names: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.comment_tokens: Dict[str, Set[int]] = defaultdict(set)
+        max_tokens = 1
+        for table_idx, table in enumerate(self.tables):
+            key = term_key(table.name)
+            self.table_names[key].append(table_idx)
+            self.schema_names[term_key(table.schema)].append(table_idx)
+            max_tokens = max(max_tokens, key.count("_") + 1)
+            for token in tokenize(table.comment or ""):
+                self.comment_tokens[normalize_token(token)].add(table_idx)
+            for column_idx, column in enumerate(table.columns):
+                key = term_key(column.name)
+                self.column_names[key].append((table_idx, column_idx))
+                max_tokens = max(max_tokens, key.count("_") + 1)
+                for token in tokenize(column.comment or ""):
+                    self.comment_tokens[normalize_token(token)].add(table_idx)
+        self.max_tokens = min(max_tokens, MAX_IDENTIFIER_TOKENS)
+
+    def _matched_keys(self, question: str) -> List[str]:
+        """Question n-grams that hit the index, minus those inside a longer hit (``id`` in ``order_id``)."""
+        hits = [
+            key
+            for key in question_keys(question, self.max_tokens, fold_plurals=True)
+            if key in self.table_names or key in self.schema_names or key in self.column_names or key in self.comment_tokens
+        ]
+        wrapped = [f"_{key}_" for key in hits]
+        return [key for key in hits if not any(f"_{key}_" in other and other != f"_{key}_" for other in wrapped)]
+
+    def matching_columns(self, question: str) -> Sequence[Tuple[int, int]]:
+        keys = self._matched_keys(question)
+        hits = [posting for key in keys for posting in self.column_names.get(key, ())]
+        return sorted(hits)
+
+
+__all__ = ["MetadataIndex", "identifier_key", "normalize_token", "question_keys", "term_key", "tokenize"]
@@ -0,0 +1,127 @@
+"""BM25 table ranking for schema context selection."""
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+from app.schema.index import identifier_key, normalize_token, question_keys, tokenize
+
+if TYPE_CHECKING:
+    from app.schema.unity import Table
+
+# Per-field term frequency multipliers (BM25F style).
+FIELD_WEIGHTS = {
+    "table": 3.0,
+    "schema": 1.0,
+    "column": 1.0,
+    "comment": 0.5,
+}
+SYNONYM_WEIGHT = 0.75
+
+
+def _identifier_terms(name: str) -> List[str]:
+    tokens = [normalize_token(token) for token in tokenize(name)]
+    key = identifier_key(name)
+    # The whole identifier is its own term so exact multi-word matches outrank partial ones.
+    return tokens + [key] if "_" in key else tokens
+
+
+class TableRanker:
+    """Ranks tables against a question with BM25 over table, column, and comment text.
+
+    The term/document matrix is precomputed as CSR-by-term NumPy arrays holding
+    final BM25 weights, so a query is one vectorized scatter-add per question
+    term.
+    """
+
+    def __init__(self, tables: Iterable["Table"], k1: float = 1.2, b: float = 0.75) -> None:
+        self.tables: List["Table"] = list(tables)
+        frequencies: List[Counter] = []
+        for table in self.tables:
+            counts: Counter = Counter()
+            for term in _identifier_terms(table.name):
+                counts[term] += FIELD_WEIGHTS["table"]
+            for term in _identifier_terms(table.schema):
+                counts[term] += FIELD_WEIGHTS["schema"]
+            for term in tokenize(table.comment or ""):
+                counts[normalize_token(term)] += FIELD_WEIGHTS["comment"]
+            for column in table.columns:
+                for term in _identifier_terms(column.name):
+                    counts[term] += FIELD_WEIGHTS["column"]
+                for term in tokenize(column.comment or ""):
+                    counts[normalize_token(term)] += FIELD_WEIGHTS["comment"]
+            frequencies.append(counts)
+
+        doc_count = len(self.tables)
+        lengths = np.array([sum(counts.values()) for counts in frequencies], dtype=np.float32)
+        avg_length = float(lengths.mean()) if doc_count else 1.0
+        norms = k1 * (1 - b + b * lengths / (avg_length or 1.0))
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for doc_idx, counts in enumerate(frequencies):
+            for term in counts:
+                postings[term].append(doc_idx)
+
+        self.vocabulary: Dict[str, int] = {}
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for term, docs in postings.items():
+            self.vocabulary[term] = len(self.vocabulary)
+            idf = np.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_idx in docs:
+                tf = frequencies[doc_idx][term]
+                data.append(idf * tf * (k1 + 1) / (tf + norms[doc_idx]))
+            indices.extend(docs)
+            indptr.append(len(indices))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.data = np.asarray(data, dtype=np.float32)
+
+    def query_terms(self, question: str, synonyms: Optional[Mapping[str, str]] = None) -> Dict[str, float]:
+        terms: Dict[str, float] = {}
+        for token in tokenize(question):
+            terms[normalize_token(token)] = 1.0
+        for key in question_keys(question):
+            if "_" in key:
+                terms[key] = 1.0
+        question_tokens = set(tokenize(question))
+        for alias, canonical in (synonyms or {}).items():
+            if set(tokenize(alias)) <= question_tokens:
+                for part in canonical.split("."):
+                    for term in _identifier_terms(part):
+                        terms.setdefault(term, SYNONYM_WEIGHT)
+        return terms
+
+    def score(self, question: str, synonyms: Optional[Mapping[str, str]] = None) -> np.ndarray:
+        scores = np.zeros(len(self.tables), dtype=np.float32)
+        for term, weight in self.query_terms(question, synonyms).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            # Each document appears at most once per term, so fancy-index += is safe.
+            scores[self.indices[start:end]] += weight * self.data[start:end]
+        return scores
+
+    def top_tables(
+        self,
+        question: str,
+        top_k: int,
+        synonyms: Optional[Mapping[str, str]] = None,
+    ) -> List["Table"]:
+        if not self.tables or top_k <= 0:
+            return []
+        scores = self.score(question, synonyms)
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        # Highest score first; catalog order breaks exact ties deterministically.
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [self.tables[idx] for idx in order]
+
+
+__all__ = ["TableRanker", "normalize_token"]
@@ -0,0 +1,132 @@
+"""Primary/foreign key graph inferred once per metadata version."""
+from __future__ import annotations
+
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from app.schema.unity import Table
+
+
+@dataclass(frozen=True)
+class ForeignKeyEdge:
+    source: str
+    column: str
+    target: str
+    target_column: str
+
+    def reversed(self) -> "ForeignKeyEdge":
+        return ForeignKeyEdge(self.target, self.target_column, self.source, self.column)
+
+    def condition(self) -> str:
+        return f"{self.source}.{self.column} = {self.target}.{self.target_column}"
+
+
+def _target_names(ref: str) -> List[str]:
+    """Table names an ``<ref>_id`` column may point at: ``customer`` -> customer, customers."""
+    names = [ref, f"{ref}s", f"{ref}es"]
+    if ref.endswith("y"):
+        names.append(f"{ref[:-1]}ies")
+    return names
+
+
+class RelationshipGraph:
+    """Inferred PK/FK relationships with join-path lookups.
+
+    ``<name>_id`` columns become foreign keys only when a table named after
+    ``<name>`` (singular or plural) exists in the same schema, or uniquely in
+    the same catalog, and has an ``id`` column to join on.
+    """
+
+    def __init__(self, tables: Iterable["Table"]) -> None:
+        tables = list(tables)
+        by_schema: Dict[Tuple[str, str, str], "Table"] = {}
+        by_catalog: Dict[Tuple[str, str], List["Table"]] = defaultdict(list)
+        for table in tables:
+            by_schema[(table.catalog, table.schema, table.name)] = table
+            by_catalog[(table.catalog, table.name)].append(table)
+
+        self.primary_keys: Dict[str, List[str]] = {}
+        self.foreign_keys: Dict[str, List[ForeignKeyEdge]] = {}
+        self.adjacency: Dict[str, List[ForeignKeyEdge]] = defaultdict(list)
+        for table in tables:
+            column_names = [column.name for column in table.columns]
+            self.primary_keys[table.full_name] = [name for name in column_names if name.endswith("_id") or name == "id"]
+            edges: List[ForeignKeyEdge] = []
+            for name in column_names:
+                if not name.endswith("_id") or name == "_id":
+                    continue
+                target = self._resolve(table, name[: -len("_id")], by_schema, by_catalog)
+                if target is None:
+                    continue
+                edge = ForeignKeyEdge(table.full_name, name, target.full_name, "id")
+                edges.append(edge)
+                self.adjacency[edge.source].append(edge)
+                self.adjacency[edge.target].append(edge.reversed())
+            self.foreign_keys[table.full_name] = edges
+
+    @staticmethod
+    def _resolve(
+        table: "Table",
+        ref: str,
+        by_schema: Dict[Tuple[str, str, str], "Table"],
+        by_catalog: Dict[Tuple[str, str], List["Table"]],
+    ) -> Optional["Table"]:
+        for name in _target_names(ref):
+            candidate = by_schema.get((table.catalog, table.schema, name))
+            if candidate is None:
+                matches = by_catalog.get((table.catalog, name), [])
+                candidate = matches[0] if len(matches) == 1 else None
+            if candidate is None or candidate.full_name == table.full_name:
+                continue
+            if any(column.name == "id" for column in candidate.columns):
+                return candidate
+        return None
+
+    def pk_fk(self, table: "Table") -> Dict[str, List[str]]:
+        """Same shape as :func:`app.schema.unity.derive_pk_fk`, with validated FK targets."""
+        return {
+            "pk": self.primary_keys.get(table.full_name, []),
+            "fk": [f"{edge.column}->{edge.target}({edge.target_column})" for edge in self.foreign_keys.get(table.full_name, [])],
+        }
+
+    def join_path(self, source: str, target: str, max_hops: int = 3) -> Optional[List[ForeignKeyEdge]]:
+        """Shortest chain of FK joins from ``source`` to ``target`` (``[]`` when they are the same)."""
+        if source == target:
+            return []
+        previous: Dict[str, ForeignKeyEdge] = {}
+        queue = deque([(source, 0)])
+        seen = {source}
+        while queue:
+            node, depth = queue.popleft()
+            if depth >= max_hops:
+                continue
+            for edge in self.adjacency.get(node, ()):
+                if edge.target in seen:
+                    continue
+                seen.add(edge.target)
+                previous[edge.target] = edge
+                if edge.target == target:
+                    path = [edge]
+                    while path[0].source != source:
+                        path.insert(0, previous[path[0].source])
+                    return path
+                queue.append((edge.target, depth + 1))
+        return None
+
+    def join_hints(self, full_names: Sequence[str], max_hops: int = 2) -> List[str]:
+        """Join conditions connecting the given tables, shortest paths first and deduplicated."""
+        conditions: List[str] = []
+        seen = set()
+        for i, source in enumerate(full_names):
+            for target in full_names[i + 1:]:
+                for edge in self.join_path(source, target, max_hops) or []:
+                    key = frozenset((edge.source, edge.column, edge.target, edge.target_column))
+                    if key not in seen:
+                        seen.add(key)
+                        conditions.append(edge.condition())
+        return conditions
+
+
+__all__ = ["ForeignKeyEdge", "RelationshipGraph"]
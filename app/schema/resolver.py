@@ -1,8 +1,9 @@
 """Schema resolver utilities for mapping user terms."""
 from __future__ import annotations
 
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from app.schema.index import MetadataIndex
 from app.schema.unity import Table, get_synonyms
 
 
@@ -15,13 +16,17 @@ def resolve_synonyms(question: str) -> Dict[str, str]:
     return matched
 
 
-def surface_relevant_columns(question: str, tables: Iterable[Table]) -> List[Tuple[str, str]]:
-    question_lower = question.lower()
+def surface_relevant_columns(
+    question: str,
+    tables: Iterable[Table],
+    index: Optional[MetadataIndex] = None,
+) -> List[Tuple[str, str]]:
+    if index is None:
+        index = MetadataIndex(tables)
     results: List[Tuple[str, str]] = []
-    for table in tables:
-        for column in table.columns:
-            if column.name.lower() in question_lower:
-                results.append((table.full_name, column.name))
+    for table_idx, column_idx in index.matching_columns(question):
+        table = index.tables[table_idx]
+        results.append((table.full_name, table.columns[column_idx].name))
     return results
 
 
@@ -0,0 +1,189 @@
+"""Pre-serialized, versioned /schema payloads."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import importlib.util
+import json
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from app.cache import BoundedTTLCache
+from app.config import get_settings
+from app.schema.relationships import RelationshipGraph
+from app.schema.unity import Table
+
+_HAS_BROTLI = importlib.util.find_spec("brotli") is not None
+
+
+def _dumps(value: object) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def table_payload(table: Table, relationships: RelationshipGraph) -> Dict[str, object]:
+    """Plain-dict equivalent of ``SchemaTable`` (same keys, same order)."""
+    return {
+        "full_name": table.full_name,
+        "columns": [{"name": column.name, "type": column.type, "comment": column.comment} for column in table.columns],
+        "pk": relationships.primary_keys.get(table.full_name, []),
+        "fk": [
+            {"col": edge.column, "ref": f"{edge.target}({edge.target_column})"}
+            for edge in relationships.foreign_keys.get(table.full_name, [])
+        ],
+        "comment": table.comment,
+    }
+
+
+@dataclass
+class SchemaDocument:
+    """One serialized /schema response with lazily compressed variants."""
+
+    body: bytes
+    etag: str
+    _encoded: Dict[str, bytes] = field(default_factory=dict, repr=False)
+
+    def encode(self, encoding: str) -> bytes:
+        if encoding == "identity":
+            return self.body
+        if encoding not in self._encoded:
+            if encoding == "br":
+                import brotli  # type: ignore
+
+                self._encoded[encoding] = brotli.compress(self.body, quality=5)
+            else:
+                self._encoded[encoding] = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._encoded[encoding]
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> str:
+    offered = {part.split(";", 1)[0].strip().lower() for part in (accept_encoding or "").split(",")}
+    if _HAS_BROTLI and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return "identity"
+
+
+class SchemaSerializer:
+    """Caches per-table JSON fragments per metadata version and assembled documents per query.
+
+    Fragments are serialized once per version; any filter or page of the
+    schema is then a byte join of fragments, cached by version and query.
+    """
+
+    def __init__(self, ttl_seconds: float, max_documents: int = 64, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self._version: Optional[str] = None
+        self._names: List[str] = []
+        self._fragments: Dict[str, bytes] = {}
+        # Compressed variants are usually far smaller than the body, so 2x bounds a document.
+        self._documents = BoundedTTLCache(
+            ttl_seconds,
+            max_entries=max_documents,
+            max_bytes=max_bytes,
+            sizeof=lambda document: 2 * len(document.body),
+        )
+        self._lock = threading.Lock()
+
+    def _ensure_fragments(
+        self, version: str, tables: List[Table], relationships: RelationshipGraph
+    ) -> Tuple[Dict[str, bytes], List[str]]:
+        """Fragments and table names for ``version``, read under the same lock that installs them.
+
+        A caller holding an older snapshot may swap its version back in, so
+        callers must use what this returns rather than re-reading the fields.
+        """
+        with self._lock:
+            if self._version != version:
+                self._fragments = {table.full_name: _dumps(table_payload(table, relationships)) for table in tables}
+                self._names = [table.full_name for table in tables]
+                self._documents.clear()
+                self._version = version
+            return self._fragments, self._names
+
+    @staticmethod
+    def _select(names: List[str], catalog: Optional[str], schema: Optional[str]) -> List[str]:
+        if catalog:
+            names = [name for name in names if name.split(".", 1)[0] == catalog]
+        if schema:
+            names = [name for name in names if name.split(".", 2)[1] == schema]
+        return names
+
+    @staticmethod
+    def etag(
+        version: str,
+        synonyms: Mapping[str, str],
+        catalog: Optional[str],
+        schema: Optional[str],
+        offset: int,
+        limit: Optional[int],
+        fmt: str = "json",
+        encoding: str = "identity",
+    ) -> str:
+        """Validator for one representation; the version is a content hash, so no body hashing is needed.
+
+        ``encoding`` is part of the key because a strong ETag identifies the
+        exact bytes sent, and the gzip and brotli variants differ.
+        """
+        page = f"{offset}|{limit if limit is not None else ''}"
+        key = f"{fmt}|{encoding}|{version}|{catalog or ''}|{schema or ''}|{page}|"
+        digest = hashlib.sha1(key.encode("utf-8") + _dumps(dict(sorted(synonyms.items()))))
+        return f'"{digest.hexdigest()[:20]}"'
+
+    def document(
+        self,
+        version: str,
+        tables: List[Table],
+        relationships: RelationshipGraph,
+        synonyms: Mapping[str, str],
+        catalog: Optional[str] = None,
+        schema: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> SchemaDocument:
+        fragments, names = self._ensure_fragments(version, tables, relationships)
+        key = self.etag(version, synonyms, catalog, schema, offset, limit)
+        cached = self._documents.get(key)
+        if cached is not None:
+            return cached
+        names = self._select(names, catalog, schema)
+        page = names[offset: offset + limit if limit is not None else None]
+        body = b"".join(
+            [
+                b'{"tables":[',
+                b",".join(fragments[name] for name in page),
+                b'],"synonyms":',
+                _dumps(dict(synonyms)),
+                b',"total":',
+                str(len(names)).encode("ascii"),
+                b"}",
+            ]
+        )
+        document = SchemaDocument(body=body, etag=key)
+        self._documents.set(key, document)
+        return document
+
+    def ndjson(
+        self,
+        version: str,
+        tables: List[Table],
+        relationships: RelationshipGraph,
+        catalog: Optional[str] = None,
+        schema: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[bytes]:
+        """One table per line, streamed straight from the cached fragments."""
+        fragments, names = self._ensure_fragments(version, tables, relationships)
+        names = self._select(names, catalog, schema)
+        for name in names[offset: offset + limit if limit is not None else None]:
+            yield fragments[name] + b"\n"
+
+
+@lru_cache()
+def get_schema_serializer() -> SchemaSerializer:
+    return SchemaSerializer(ttl_seconds=get_settings().cache_ttl_seconds)
+
+
+__all__ = ["SchemaDocument", "SchemaSerializer", "choose_encoding", "get_schema_serializer", "table_payload"]
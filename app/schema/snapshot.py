@@ -0,0 +1,69 @@
+"""On-disk snapshot of Unity Catalog metadata for fast worker cold starts."""
+from __future__ import annotations
+
+import mmap
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+from app.utils import logger
+
+if TYPE_CHECKING:
+    from app.schema.unity import Table
+
+SNAPSHOT_FORMAT = 1
+
+
+@dataclass
+class MetadataSnapshot:
+    tables: List["Table"]
+    version: str
+    watermark: Optional[Any]
+    scope: Dict[str, List[str]]
+    derived: Dict[str, Any] = field(default_factory=dict)
+    format: int = SNAPSHOT_FORMAT
+
+
+def snapshot_scope(catalogs: Sequence[str], schemas: Sequence[str]) -> Dict[str, List[str]]:
+    return {"catalogs": sorted(catalogs), "schemas": sorted(schemas)}
+
+
+def save_snapshot(path: str, snapshot: MetadataSnapshot) -> None:
+    """Atomically write ``snapshot`` so concurrent workers never read a partial file."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            pickle.dump(snapshot, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def load_snapshot(path: str, scope: Dict[str, List[str]]) -> Optional[MetadataSnapshot]:
+    """Memory-map and unpickle a snapshot written by this service.
+
+    Returns ``None`` when the file is missing, unreadable, from another format
+    version, or was taken for a different catalog/schema scope. Snapshots are
+    pickles, so ``path`` must only ever be writable by the service itself.
+    """
+    target = Path(path)
+    if not target.is_file() or target.stat().st_size == 0:
+        return None
+    try:
+        with target.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            snapshot = pickle.loads(mapped)
+    except Exception:  # noqa: BLE001 - a bad snapshot just means a cold load
+        logger.warning("Ignoring unreadable metadata snapshot at %s", path, exc_info=True)
+        return None
+    if not isinstance(snapshot, MetadataSnapshot) or snapshot.format != SNAPSHOT_FORMAT or snapshot.scope != scope:
+        return None
+    return snapshot
+
+
+__all__ = ["MetadataSnapshot", "load_snapshot", "save_snapshot", "snapshot_scope"]
@@ -1,64 +1,182 @@
 """Unity Catalog metadata utilities."""
 from __future__ import annotations
 
+import hashlib
 import re
+import sys
+import threading
+import time
 from contextlib import closing
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional
-
-from app.sql.dbsql import dbsql
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
 
 from app.config import get_settings
-from app.utils import TTLCache
+from app.schema.index import MetadataIndex
+from app.schema.ranking import TableRanker
+from app.schema.relationships import RelationshipGraph
+from app.schema.snapshot import MetadataSnapshot, load_snapshot, save_snapshot, snapshot_scope
+from app.sql.pool import get_connection_pool
+from app.utils import logger
+
+T = TypeVar("T")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Column:
+    """Immutable column record; identifier and type strings are interned."""
+
     name: str
     type: str
     comment: Optional[str]
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "name", sys.intern(self.name))
+        object.__setattr__(self, "type", sys.intern(self.type))
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Table:
+    """Immutable table record.
+
+    Catalog, schema, and table names are interned so the thousands of tables
+    sharing a catalog/schema reference one string each. ``columns`` is stored
+    as a tuple (a fixed-size pointer array with no list over-allocation) and
+    ``full_name`` is computed once at construction.
+    """
+
     catalog: str
     schema: str
     name: str
-    columns: List[Column]
+    columns: Sequence[Column]
     comment: Optional[str]
+    full_name: str = field(init=False, repr=False, compare=False)
 
-    @property
-    def full_name(self) -> str:
-        return f"{self.catalog}.{self.schema}.{self.name}"
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "catalog", sys.intern(self.catalog))
+        object.__setattr__(self, "schema", sys.intern(self.schema))
+        object.__setattr__(self, "name", sys.intern(self.name))
+        object.__setattr__(self, "columns", tuple(self.columns))
+        object.__setattr__(self, "full_name", f"{self.catalog}.{self.schema}.{self.name}")
+
+
+def metadata_version(tables: Iterable[Table]) -> str:
+    """Content fingerprint of the catalog; changes whenever a table or column changes."""
+    digest = hashlib.sha1()
+    for table in tables:
+        digest.update(f"{table.full_name}|{table.comment or ''}\n".encode("utf-8"))
+        for column in table.columns:
+            digest.update(f"{column.name}|{column.type}|{column.comment or ''}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
 
 
 class UnityCatalogClient:
-    """Fetches and caches Unity Catalog metadata."""
+    """Fetches and caches Unity Catalog metadata.
+
+    The first call loads the full catalog synchronously. After that the cached
+    tables are always served immediately; once they are older than
+    ``cache_ttl_seconds`` a background thread fetches only tables altered since
+    the last sync (stale-while-revalidate) and swaps in the merged result.
+
+    When ``metadata_snapshot_path`` is set, every sync is also written to disk
+    together with the derived indexes. New clients start from that snapshot
+    and revalidate it in the background instead of blocking on a full load.
+    """
+
+    RETRY_SECONDS = 30
 
     def __init__(self) -> None:
         settings = get_settings()
-        self.host = settings.databricks_host
-        self.http_path = settings.databricks_http_path
-        self.token = settings.databricks_pat
+        self.pool = get_connection_pool()
         self.catalogs = settings.default_catalogs
         self.schemas = settings.default_schemas
-        self.cache = TTLCache(settings.cache_ttl_seconds)
+        self.ttl_seconds = settings.cache_ttl_seconds
+        self.snapshot_path = settings.metadata_snapshot_path
+        # Tables and version are swapped together so readers never see a mismatched pair.
+        self._state: Optional[Tuple[List[Table], str]] = None
+        self.watermark: Optional[Any] = None
+        self.synced_at: Optional[float] = None
+        # Wall-clock time, duration and source ("snapshot" or "warehouse") of the last load.
+        self.loaded_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.loaded_from: Optional[str] = None
+        self._refresh_due = 0.0
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._derived: Dict[str, Any] = {}
+        self._derived_version: Optional[str] = None
+        self._builders: Dict[str, Callable[[List[Table]], Any]] = {
+            "index": MetadataIndex,
+            "ranker": TableRanker,
+            "relationships": RelationshipGraph,
+        }
+        self._derived_lock = threading.Lock()
+        if self.snapshot_path:
+            self._restore_snapshot()
+
+    def _record_load(self, source: str, started: float) -> None:
+        self.loaded_at = time.time()
+        self.load_seconds = time.monotonic() - started
+        self.loaded_from = source
 
-    def _connect(self):
-        return dbsql.connect(
-            server_hostname=self.host,
-            http_path=self.http_path,
-            access_token=self.token,
+    def _restore_snapshot(self) -> None:
+        started = time.monotonic()
+        snapshot = load_snapshot(self.snapshot_path, snapshot_scope(self.catalogs, self.schemas))
+        if snapshot is None:
+            return
+        with self._derived_lock:
+            self._derived = {name: value for name, value in snapshot.derived.items() if name in self._builders}
+            self._derived_version = snapshot.version
+        self._state = (snapshot.tables, snapshot.version)
+        self.watermark = snapshot.watermark
+        self._record_load("snapshot", started)
+        # Serve the snapshot right away but revalidate it on first use.
+        self._refresh_due = 0.0
+
+    def _save_snapshot(self) -> None:
+        state = self._state
+        if not self.snapshot_path or state is None:
+            return
+        with self._derived_lock:
+            derived = dict(self._derived) if self._derived_version == state[1] else {}
+        snapshot = MetadataSnapshot(
+            tables=state[0],
+            version=state[1],
+            watermark=self.watermark,
+            scope=snapshot_scope(self.catalogs, self.schemas),
+            derived=derived,
         )
+        try:
+            save_snapshot(self.snapshot_path, snapshot)
+        except OSError:
+            logger.warning("Could not write metadata snapshot to %s", self.snapshot_path, exc_info=True)
 
-    def _load_metadata(self) -> List[Table]:
-        conditions: List[str] = ["table_schema NOT IN ('information_schema')"]
+    def _conditions(self) -> List[str]:
+        conditions: List[str] = ["{alias}.table_schema NOT IN ('information_schema')"]
         if self.catalogs:
             formatted = ",".join(f"'{c}'" for c in self.catalogs)
-            conditions.append(f"table_catalog IN ({formatted})")
+            conditions.append(f"{{alias}}.table_catalog IN ({formatted})")
         if self.schemas:
             formatted = ",".join(f"'{s}'" for s in self.schemas)
-            conditions.append(f"table_schema IN ({formatted})")
+            conditions.append(f"{{alias}}.table_schema IN ({formatted})")
+        return conditions
+
+    @staticmethod
+    def _timestamp_literal(value: Any) -> str:
+        text = value.isoformat(sep=" ") if isinstance(value, datetime) else str(value)
+        return f"TIMESTAMP '{text}'"
+
+    def _fetch(self, query: str) -> List[Tuple[Any, ...]]:
+        with self.pool.connection() as connection:
+            with closing(connection.cursor()) as cursor:
+                cursor.execute(query)
+                return cursor.fetchall()
+
+    def _load_metadata(self, since: Optional[Any] = None) -> Tuple[List[Table], Optional[Any]]:
+        """Load tables (all, or only those altered at/after ``since``) and the newest ``last_altered`` seen."""
+        conditions = [condition.format(alias="c") for condition in self._conditions()]
+        if since is not None:
+            conditions.append(f"t.last_altered >= {self._timestamp_literal(since)}")
         where_clause = " AND ".join(conditions)
         query = f"""
             SELECT
@@ -68,7 +186,8 @@ class UnityCatalogClient:
                 c.column_name,
                 c.data_type,
                 c.comment AS column_comment,
-                t.comment AS table_comment
+                t.comment AS table_comment,
+                t.last_altered
             FROM system.information_schema.columns c
             LEFT JOIN system.information_schema.tables t
                 ON c.table_catalog = t.table_catalog
@@ -77,33 +196,151 @@ class UnityCatalogClient:
             WHERE {where_clause}
             ORDER BY c.table_catalog, c.table_schema, c.table_name, c.ordinal_position
         """
-        with self._connect() as connection:
-            with closing(connection.cursor()) as cursor:
-                cursor.execute(query)
-                rows = cursor.fetchall()
+        rows = self._fetch(query)
 
-        tables: Dict[str, Table] = {}
-        for catalog, schema, name, column, dtype, column_comment, table_comment in rows:
+        grouped: Dict[str, Tuple[Tuple[str, str, str, str], List[Column]]] = {}
+        watermark = since
+        for catalog, schema, name, column, dtype, column_comment, table_comment, last_altered in rows:
+            if last_altered is not None and (watermark is None or last_altered > watermark):
+                watermark = last_altered
             key = f"{catalog}.{schema}.{name}"
-            if key not in tables:
+            if key not in grouped:
                 derived_comment = table_comment or name.replace("_", " ")
-                tables[key] = Table(
-                    catalog=catalog,
-                    schema=schema,
-                    name=name,
-                    columns=[],
-                    comment=derived_comment,
-                )
-            tables[key].columns.append(Column(name=column, type=dtype, comment=column_comment))
-        return list(tables.values())
+                grouped[key] = ((catalog, schema, name, derived_comment), [])
+            grouped[key][1].append(Column(name=column, type=dtype, comment=column_comment))
+        tables = [
+            Table(catalog=catalog, schema=schema, name=name, columns=columns, comment=comment)
+            for (catalog, schema, name, comment), columns in grouped.values()
+        ]
+        return tables, watermark
+
+    def _load_table_names(self) -> Set[str]:
+        where_clause = " AND ".join(condition.format(alias="t") for condition in self._conditions())
+        query = f"""
+            SELECT t.table_catalog, t.table_schema, t.table_name
+            FROM system.information_schema.tables t
+            WHERE {where_clause}
+        """
+        return {f"{catalog}.{schema}.{name}" for catalog, schema, name in self._fetch(query)}
+
+    def _publish(self, tables: List[Table], watermark: Optional[Any]) -> None:
+        tables.sort(key=lambda table: (table.catalog, table.schema, table.name))
+        version = metadata_version(tables)
+        changed = version != self.version
+        if changed:
+            # Rebuild derived artifacts before swapping so readers never pay for them.
+            with self._derived_lock:
+                builders = dict(self._builders)
+            derived = {name: build(tables) for name, build in builders.items()}
+            with self._derived_lock:
+                self._derived = derived
+                self._derived_version = version
+        self._state = (tables, version)
+        self.watermark = watermark
+        self.synced_at = time.monotonic()
+        self._refresh_due = self.synced_at + self.ttl_seconds
+        if changed:
+            self._save_snapshot()
+
+    def refresh(self) -> None:
+        """Synchronously bring the cache up to date, incrementally when a previous sync exists."""
+        with self._refresh_lock:
+            started = time.monotonic()
+            state = self._state
+            if state is None or self.watermark is None:
+                tables, watermark = self._load_metadata()
+                self._publish(tables, watermark)
+            else:
+                changed, watermark = self._load_metadata(since=self.watermark)
+                existing = self._load_table_names()
+                merged = {table.full_name: table for table in state[0] if table.full_name in existing}
+                merged.update((table.full_name, table) for table in changed)
+                self._publish(list(merged.values()), watermark)
+            self._record_load("warehouse", started)
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception:  # noqa: BLE001 - keep serving stale metadata
+            logger.exception("Unity Catalog metadata refresh failed")
+            self._refresh_due = time.monotonic() + min(self.ttl_seconds, self.RETRY_SECONDS)
+
+    def _current(self) -> Tuple[List[Table], str]:
+        state = self._state
+        if state is None:
+            with self._load_lock:
+                if self._state is None:
+                    self.refresh()
+                state = self._state
+            assert state is not None
+        elif time.monotonic() >= self._refresh_due and not self._refresh_lock.locked():
+            # Push the deadline out first so concurrent readers start only one refresh.
+            self._refresh_due = time.monotonic() + self.ttl_seconds
+            threading.Thread(target=self._refresh_in_background, name="unity-refresh", daemon=True).start()
+        return state
+
+    @property
+    def version(self) -> Optional[str]:
+        state = self._state
+        return state[1] if state is not None else None
+
+    def warm_up(self) -> None:
+        """Load metadata (or revalidate a restored snapshot) and build every derived artifact."""
+        self._current()
+        self.get_index()
+        self.get_ranker()
+        self.get_relationships()
+
+    def status(self) -> Dict[str, Any]:
+        state = self._state
+        return {
+            "loaded": state is not None,
+            "version": state[1] if state is not None else None,
+            "tables": len(state[0]) if state is not None else 0,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "loaded_from": self.loaded_from,
+        }
 
     def get_tables(self) -> List[Table]:
-        cached = self.cache.get("metadata")
-        if cached is not None:
-            return cached
-        tables = self._load_metadata()
-        self.cache.set("metadata", tables)
-        return tables
+        return self._current()[0]
+
+    def derived(self, name: str, build: Callable[[List[Table]], T]) -> T:
+        """Return an artifact computed from the metadata, rebuilt only when the version changes."""
+        tables, version = self._current()
+        return self._derive(name, build, tables, version)
+
+    def _derive(self, name: str, build: Callable[[List[Table]], T], tables: List[Table], version: str) -> T:
+        with self._derived_lock:
+            self._builders.setdefault(name, build)
+            if self._derived_version != version:
+                state = self._state
+                if state is not None and state[1] != version:
+                    # A newer version was published after ``tables`` was read; keep its artifacts.
+                    return build(tables)
+                self._derived = {}
+                self._derived_version = version
+            if name not in self._derived:
+                self._derived[name] = build(tables)
+            return self._derived[name]
+
+    def snapshot(self) -> Tuple[List[Table], str, RelationshipGraph]:
+        """Tables, version and relationships from one published state.
+
+        Separate ``get_tables()``/``version``/``get_relationships()`` reads can
+        straddle a background refresh and pair old tables with a new version.
+        """
+        tables, version = self._current()
+        return tables, version, self._derive("relationships", RelationshipGraph, tables, version)
+
+    def get_index(self) -> MetadataIndex:
+        return self.derived("index", MetadataIndex)
+
+    def get_ranker(self) -> TableRanker:
+        return self.derived("ranker", TableRanker)
+
+    def get_relationships(self) -> RelationshipGraph:
+        return self.derived("relationships", RelationshipGraph)
 
 
 def derive_pk_fk(table: Table) -> Dict[str, List[str]]:
@@ -123,26 +360,19 @@ def build_condensed_context(
     question: str,
     top_k_tables: int = 12,
     max_columns: int = 50,
+    ranker: Optional[TableRanker] = None,
+    relationships: Optional[RelationshipGraph] = None,
 ) -> Dict[str, List[str] | str]:
-    question_lower = question.lower()
-    scored: List[tuple[int, Table]] = []
-    for table in tables:
-        score = 0
-        if table.name.lower() in question_lower:
-            score += 3
-        if table.schema.lower() in question_lower:
-            score += 1
-        for column in table.columns:
-            if column.name.lower() in question_lower:
-                score += 1
-        scored.append((score, table))
-    scored.sort(key=lambda item: item[0], reverse=True)
-    selected = [table for _, table in scored[:top_k_tables]]
+    if ranker is None:
+        ranker = TableRanker(tables)
+    if relationships is None:
+        relationships = RelationshipGraph(tables)
+    selected = ranker.top_tables(question, top_k_tables, synonyms=get_synonyms())
 
     context_lines: List[str] = []
     included_columns = 0
     for table in selected:
-        derived = derive_pk_fk(table)
+        derived = relationships.pk_fk(table)
         pk_line = f"PK: {', '.join(derived['pk'])}" if derived["pk"] else ""
         fk_line = "" if not derived["fk"] else "FK hints: " + ", ".join(derived["fk"])
         header = " ".join(part for part in [f"Table {table.full_name}", pk_line, fk_line] if part)
@@ -153,6 +383,9 @@ def build_condensed_context(
             desc = column.comment or column.name.replace("_", " ")
             context_lines.append(f"- {column.name} ({column.type}): {desc}")
             included_columns += 1
+    joins = relationships.join_hints([table.full_name for table in selected])
+    if joins:
+        context_lines.append("Joins: " + "; ".join(joins))
     return {
         "text": "\n".join(context_lines),
         "tables": [table.full_name for table in selected],
@@ -176,4 +409,5 @@ __all__ = [
     "build_condensed_context",
     "get_synonyms",
     "derive_pk_fk",
+    "metadata_version",
 ]
@@ -0,0 +1,67 @@
+"""Process-wide service objects created once per worker in the FastAPI lifespan."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from app.llm.planner import NL2SQLPlanner
+from app.llm.provider import LLMProvider, close_provider, get_provider
+from app.schema.unity import UnityCatalogClient
+from app.sql.executor import DatabricksExecutor, get_sql_executor
+from app.sql.pool import get_connection_pool
+from app.sql.repair import SQLRepairExecutor
+from app.utils import logger
+from app.viz.render import ChartRenderer
+
+
+@dataclass
+class Services:
+    unity_client: UnityCatalogClient
+    provider: LLMProvider
+    planner: NL2SQLPlanner
+    repair_executor: SQLRepairExecutor
+    renderer: ChartRenderer
+
+    def warm_up(self) -> None:
+        """Open warehouse connections, load metadata and start render workers before taking traffic.
+
+        Failures are logged rather than raised so the worker still starts; the
+        first request retries the load and ``/status`` reports not ready.
+        """
+        try:
+            get_connection_pool().warm()
+            self.unity_client.warm_up()
+        except Exception:  # noqa: BLE001 - serve and retry lazily instead of crash-looping
+            logger.exception("Metadata warm-up failed")
+        try:
+            self.renderer.pool.warm()
+        except Exception:  # noqa: BLE001 - workers are started again on the first render
+            logger.exception("Render worker warm-up failed")
+
+    @property
+    def ready(self) -> bool:
+        return self.unity_client.version is not None
+
+    async def aclose(self) -> None:
+        await close_provider()
+        self.renderer.close()
+        get_connection_pool().close()
+        get_connection_pool.cache_clear()
+        get_sql_executor().shutdown(wait=False, cancel_futures=True)
+        get_sql_executor.cache_clear()
+
+
+def build_services() -> Services:
+    unity_client = UnityCatalogClient()
+    provider = get_provider()
+    planner = NL2SQLPlanner(provider, unity_client)
+    repair_executor = SQLRepairExecutor(provider, DatabricksExecutor(), unity_client)
+    return Services(
+        unity_client=unity_client,
+        provider=provider,
+        planner=planner,
+        repair_executor=repair_executor,
+        renderer=ChartRenderer(),
+    )
+
+
+__all__ = ["Services", "build_services"]
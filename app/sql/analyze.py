@@ -0,0 +1,325 @@
+"""Local analysis of generated SQL against cached Unity Catalog metadata."""
+from __future__ import annotations
+
+import difflib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.sql.lexer import Token, tokenize
+
+if TYPE_CHECKING:
+    from app.schema.unity import Table
+
+# Words that are never column references. Column names that collide with these
+# (``date``, ``year``) are simply not checked.
+SQL_KEYWORDS = frozenset(
+    """
+    ALL AND ANTI ANY ARRAY AS ASC BETWEEN BIGINT BINARY BOOLEAN BOTH BY CASE CAST CLUSTER CROSS CUBE
+    CURRENT CURRENT_DATE CURRENT_TIMESTAMP CURRENT_USER DATE DAY DAYS DECIMAL DESC DISTINCT DISTRIBUTE
+    DOUBLE ELSE END ESCAPE EXCEPT EXISTS FALSE FILTER FIRST FLOAT FOLLOWING FOR FROM FULL GROUP GROUPING
+    HAVING HOUR HOURS IF ILIKE IN INNER INT INTEGER INTERSECT INTERVAL INTO IS JOIN LAST LATERAL LEADING
+    LEFT LIKE LIMIT LONG MAP MINUS MINUTE MINUTES MONTH MONTHS NATURAL NOT NULL NULLS OF OFFSET ON OR
+    ORDER OUTER OVER PARTITION PIVOT PRECEDING QUALIFY RANGE RECURSIVE RIGHT RLIKE ROLLUP ROW ROWS
+    SECOND SECONDS SELECT SEMI SETS SMALLINT SORT STRING STRUCT TABLESAMPLE THEN TIMESTAMP TINYINT TO
+    TRAILING TRUE UNBOUNDED UNION UNKNOWN UNPIVOT USING VALUES VIEW WEEK WEEKS WHEN WHERE WINDOW WITH
+    WITHIN YEAR YEARS
+    """.split()
+)
+# Functions whose arguments use FROM without introducing a table.
+_FROM_FUNCTIONS = frozenset({"EXTRACT", "TRIM", "SUBSTRING", "SUBSTR", "POSITION", "OVERLAY"})
+# Constructs that introduce columns the analyzer does not model.
+_OPAQUE_WORDS = frozenset({"LATERAL", "PIVOT", "UNPIVOT", "TRANSFORM"})
+
+
+def split_name(name: str) -> Tuple[str, ...]:
+    return tuple(part.strip().strip("`").lower() for part in name.split("."))
+
+
+class CatalogLookup:
+    """Tables and their columns from cached metadata, keyed by every suffix of the full name."""
+
+    def __init__(self, tables: Iterable["Table"]) -> None:
+        self.by_suffix: Dict[Tuple[str, ...], List[str]] = defaultdict(list)
+        self.columns: Dict[str, Dict[str, str]] = {}
+        self.schemas: Set[Tuple[str, str]] = set()
+        for table in tables:
+            parts = (table.catalog.lower(), table.schema.lower(), table.name.lower())
+            self.columns[table.full_name] = {column.name.lower(): column.name for column in table.columns}
+            self.schemas.add(parts[:2])
+            for size in (1, 2, 3):
+                self.by_suffix[parts[-size:]].append(table.full_name)
+
+    def resolve(self, parts: Tuple[str, ...]) -> List[str]:
+        return self.by_suffix.get(parts, [])
+
+    def in_scope(self, parts: Tuple[str, ...]) -> bool:
+        """Whether a missing table name is definitely absent rather than outside the loaded catalogs."""
+        if len(parts) == 3:
+            return parts[:2] in self.schemas
+        if len(parts) == 2:
+            return any(schema == parts[0] for _, schema in self.schemas)
+        return False
+
+    def suggest_table(self, parts: Tuple[str, ...]) -> Optional[str]:
+        candidates = [".".join(key) for key in self.by_suffix if len(key) == len(parts)]
+        matches = difflib.get_close_matches(".".join(parts), candidates, n=1, cutoff=0.6)
+        return matches[0] if matches else None
+
+
+@dataclass
+class Analysis:
+    tables: List[str] = field(default_factory=list)
+    issues: List[str] = field(default_factory=list)
+    # True when every table and column reference was resolved locally.
+    complete: bool = True
+
+
+class SQLAnalysisError(ValueError):
+    """Raised for references that certainly do not exist; the message is written for the repair prompt."""
+
+    def __init__(self, issues: List[str]) -> None:
+        super().__init__("; ".join(issues))
+        self.issues = issues
+
+
+def _suggest(name: str, candidates: Iterable[str]) -> str:
+    matches = difflib.get_close_matches(name, list(candidates), n=1, cutoff=0.6)
+    return f"; did you mean `{matches[0]}`?" if matches else ""
+
+
+def _ends_value(token: Token) -> bool:
+    """Whether an identifier after ``token`` must be an alias (``SUM(x) total``, ``orders o``)."""
+    if token.kind in ("quoted", "string", "number") or token.text == ")":
+        return True
+    return token.kind == "word" and token.upper not in SQL_KEYWORDS
+
+
+@dataclass(frozen=True)
+class TableReference:
+    parts: Tuple[str, ...]
+    text: str
+    alias: Optional[str]
+    # Token positions of the name and alias, which are not column references.
+    indices: Tuple[int, ...]
+
+
+def _is_name(tokens: Sequence[Token], i: int) -> bool:
+    return i < len(tokens) and tokens[i].kind in ("word", "quoted")
+
+
+def _text(tokens: Sequence[Token], i: int) -> str:
+    return tokens[i].text if i < len(tokens) else ""
+
+
+def definition_indices(tokens: Sequence[Token]) -> List[int]:
+    """Positions of names defined by ``name AS (``: CTEs and named windows."""
+    return [
+        i
+        for i in range(len(tokens) - 2)
+        if _is_name(tokens, i) and tokens[i + 1].is_word("AS") and tokens[i + 2].text == "("
+    ]
+
+
+def _table_factor(tokens: Sequence[Token], i: int) -> Tuple[Optional[TableReference], int]:
+    """Parse ``name [AS] alias`` at ``i``; subqueries and table functions yield no reference."""
+    start = i
+    while _is_name(tokens, i):
+        i += 1
+        if _text(tokens, i) == "." and _is_name(tokens, i + 1):
+            i += 1
+            continue
+        break
+    names = [tokens[j] for j in range(start, i) if tokens[j].kind in ("word", "quoted")]
+    if not names or _text(tokens, i) == "(" or names[0].upper in ("LATERAL", "VALUES"):
+        return None, start
+    indices = list(range(start, i))
+    text = "".join(tokens[j].text for j in indices)
+    alias = None
+    if i < len(tokens) and tokens[i].is_word("AS"):
+        i += 1
+    if _is_name(tokens, i) and tokens[i].upper not in SQL_KEYWORDS:
+        alias = tokens[i].name
+        indices.append(i)
+        i += 1
+    return TableReference(tuple(token.name for token in names), text, alias, tuple(indices)), i
+
+
+def scan_tables(tokens: Sequence[Token]) -> Tuple[List[TableReference], bool]:
+    """Tables after FROM/JOIN (including comma joins), and whether any FROM item was not a plain table."""
+    references: List[TableReference] = []
+    opaque = False
+    openers: List[str] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.text == "(":
+            openers.append(tokens[i - 1].upper if i else "")
+        elif token.text == ")":
+            if openers:
+                openers.pop()
+        elif token.is_word("JOIN") or (token.is_word("FROM") and not (openers and openers[-1] in _FROM_FUNCTIONS)):
+            i += 1
+            while True:
+                reference, i = _table_factor(tokens, i)
+                if reference is None:
+                    opaque = True
+                else:
+                    references.append(reference)
+                if not (token.is_word("FROM") and reference is not None and _text(tokens, i) == ","):
+                    break
+                i += 1
+            continue
+        i += 1
+    return references, opaque
+
+
+class _Analyzer:
+    def __init__(self, tokens: Sequence[Token], lookup: CatalogLookup) -> None:
+        self.tokens = tokens
+        self.lookup = lookup
+        self.result = Analysis()
+        # alias or table name -> full table name, or None for CTEs, subqueries and unresolved tables
+        self.bindings: Dict[str, Optional[str]] = {}
+        self.definitions: Set[str] = set()
+        self.consumed: Set[int] = set()
+        self.opaque = False
+
+    def _issue(self, message: str) -> None:
+        if message not in self.result.issues:
+            self.result.issues.append(message)
+
+    def _is_name(self, i: int) -> bool:
+        return _is_name(self.tokens, i)
+
+    def _text(self, i: int) -> str:
+        return _text(self.tokens, i)
+
+    def run(self) -> Analysis:
+        tokens = self.tokens
+        if any(token.text == "->" or token.upper in _OPAQUE_WORDS for token in tokens):
+            self.opaque = True
+        for i in definition_indices(tokens):
+            self.definitions.add(tokens[i].name)
+            self.consumed.add(i)
+        references, opaque = scan_tables(tokens)
+        self.opaque = self.opaque or opaque
+        for reference in references:
+            self.consumed.update(reference.indices)
+            self.bindings[reference.alias or reference.parts[-1]] = self._resolve_table(reference.parts, reference.text)
+        self._check_columns()
+        self.result.complete = self.result.complete and not self.opaque and bool(self.result.tables)
+        return self.result
+
+    def _resolve_table(self, parts: Tuple[str, ...], text: str) -> Optional[str]:
+        if len(parts) == 1 and parts[0] in self.definitions:
+            self.opaque = True
+            return None
+        matches = self.lookup.resolve(parts)
+        if len(matches) == 1:
+            if matches[0] not in self.result.tables:
+                self.result.tables.append(matches[0])
+            return matches[0]
+        self.opaque = True
+        if not matches and self.lookup.in_scope(parts):
+            suggestion = self.lookup.suggest_table(parts)
+            hint = f"; did you mean {suggestion}?" if suggestion else ""
+            self._issue(f"Table or view not found: {text}{hint}")
+        return None
+
+    def _binding(self, qualifier: Tuple[str, ...]) -> Tuple[bool, Optional[str]]:
+        """``(found, full_name)`` for a column qualifier such as ``o`` or ``sales.orders``."""
+        if len(qualifier) == 1 and qualifier[0] in self.bindings:
+            return True, self.bindings[qualifier[0]]
+        suffix = ".".join(qualifier)
+        for full_name in self.result.tables:
+            if full_name.lower() == suffix or full_name.lower().endswith("." + suffix):
+                return True, full_name
+        return False, None
+
+    def _check_columns(self) -> None:
+        tokens = self.tokens
+        unqualified: List[str] = []
+        aliases: Set[str] = set()
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if not self._is_name(i) or i in self.consumed or (i and tokens[i - 1].text == "."):
+                i += 1
+                continue
+            end = i
+            while self._text(end + 1) == "." and self._is_name(end + 2):
+                end += 2
+            chain = [tokens[j] for j in range(i, end + 1, 2)]
+            previous = tokens[i - 1] if i else None
+            if self._text(end + 1) in ("(", "."):
+                pass  # function call or ``alias.*``
+            elif len(chain) > 1:
+                self._check_qualified(chain, unqualified)
+            elif token.kind == "word" and token.upper in SQL_KEYWORDS:
+                pass
+            elif token.kind == "word" and end + 1 < len(tokens) and tokens[end + 1].kind == "string":
+                pass  # typed literal prefix: ``TIMESTAMP_NTZ '2024-01-01'``, ``X'0A'``
+            elif previous is not None and (previous.is_word("AS", "OVER") or previous.text == "::" or _ends_value(previous)):
+                aliases.add(token.name)
+            else:
+                unqualified.append(token.name)
+            i = end + 1
+
+        if self.opaque or not self.result.tables:
+            return
+        known: Dict[str, str] = {}
+        for full_name in self.result.tables:
+            known.update(self.lookup.columns.get(full_name, {}))
+        scope = ", ".join(self.result.tables)
+        for name in unqualified:
+            if name not in known and name not in aliases and name not in self.bindings:
+                self._issue(f"Column `{name}` not found in {scope}{_suggest(name, known.values())}")
+
+    def _check_qualified(self, chain: List[Token], unqualified: List[str]) -> None:
+        parts = [token.name for token in chain]
+        for size in range(len(parts) - 1, 0, -1):
+            found, full_name = self._binding(tuple(parts[:size]))
+            if not found:
+                continue
+            if full_name is not None:
+                columns = self.lookup.columns.get(full_name, {})
+                if parts[size] not in columns:
+                    self._issue(f"Column `{parts[size]}` not found in {full_name}{_suggest(parts[size], columns.values())}")
+            return
+        # ``address.city`` on a struct column, or a qualifier the analyzer cannot see.
+        unqualified.append(parts[0])
+
+
+def analyze(sql_text: str, lookup: CatalogLookup, tokens: Optional[Sequence[Token]] = None) -> Analysis:
+    """Resolve table and column references in ``sql_text`` against ``lookup``.
+
+    Names are resolved query-wide rather than per scope, which errs toward
+    accepting SQL; anything the analyzer cannot model (CTEs, subqueries in
+    FROM, table functions, lambdas, PIVOT) leaves ``complete`` false and
+    skips the unqualified-column check. Pass ``tokens`` to reuse an existing
+    tokenization of ``sql_text``.
+    """
+    return _Analyzer(tokenize(sql_text) if tokens is None else tokens, lookup).run()
+
+
+def validate_locally(sql_text: str, lookup: CatalogLookup, tokens: Optional[Sequence[Token]] = None) -> bool:
+    """Raise :class:`SQLAnalysisError` for unknown references; return whether the SQL was fully resolved."""
+    analysis = analyze(sql_text, lookup, tokens)
+    if analysis.issues:
+        raise SQLAnalysisError(analysis.issues)
+    return analysis.complete
+
+
+__all__ = [
+    "Analysis",
+    "CatalogLookup",
+    "SQLAnalysisError",
+    "SQL_KEYWORDS",
+    "TableReference",
+    "analyze",
+    "definition_indices",
+    "scan_tables",
+    "split_name",
+    "validate_locally",
+]
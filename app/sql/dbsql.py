@@ -10,10 +10,16 @@ if _spec is not None:
     from databricks import sql as dbsql  # type: ignore
 else:
     class _MissingDatabricksModule:
-        class DatabaseError(Exception):
+        class Error(Exception):
             pass
 
-        class Error(Exception):
+        class DatabaseError(Error):
+            pass
+
+        class ServerOperationError(DatabaseError):
+            pass
+
+        class ProgrammingError(DatabaseError):
             pass
 
         @staticmethod
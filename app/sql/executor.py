@@ -1,35 +1,248 @@
 """Databricks SQL execution helpers."""
 from __future__ import annotations
 
-from contextlib import closing
-from typing import Any, Dict, List
-
-from app.sql.dbsql import dbsql
+import asyncio
+import importlib.util
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import closing, contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import lru_cache, partial
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Set, TypeVar, Union
 
 from app.config import get_settings
-from app.utils import summarize_rows
+from app.sql.export import EXPORT_MEDIA_TYPES, ExportFormatError, encode_arrow_batches, encode_csv_rows
+from app.sql.pool import get_connection_pool
+from app.sql.results import ColumnarRows, QueryRows
+from app.sql.validate import StatementSummary, ensure_select_only, limit_sql
+from app.utils import logger, summarize_rows
+
+T = TypeVar("T")
+
+_HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+@lru_cache()
+def get_sql_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool for blocking connector calls made from async code."""
+    settings = get_settings()
+    return ThreadPoolExecutor(max_workers=settings.sql_max_concurrency, thread_name_prefix="dbsql")
+
+
+async def run_in_sql_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_sql_executor(), partial(func, *args, **kwargs))
+
+
+class QueryTimeout(RuntimeError):
+    """The statement ran past ``sql_timeout`` and was cancelled on the warehouse."""
+
+
+class QueryCancelled(RuntimeError):
+    """The request that issued the statement went away and the statement was cancelled."""
+
+
+class CancelScope:
+    """Cursors opened on behalf of one request, cancellable from another thread.
+
+    Work run through :meth:`run` registers its cursors with the scope, so an
+    async caller that is cancelled (client disconnect, shutdown) can stop the
+    server-side statements it started.
+    """
+
+    def __init__(self) -> None:
+        self._cursors: Set[Any] = set()
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        token = _current_scope.set(self)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current_scope.reset(token)
+
+    @contextmanager
+    def track(self, cursor: Any) -> Iterator[None]:
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled("Query was cancelled before it started")
+            self._cursors.add(cursor)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._cursors.discard(cursor)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            cursors = list(self._cursors)
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception:  # noqa: BLE001 - the statement may already be finished
+                logger.warning("Failed to cancel Databricks statement", exc_info=True)
+
+
+_current_scope: ContextVar[Optional[CancelScope]] = ContextVar("sql_cancel_scope", default=None)
 
 
 class DatabricksExecutor:
+    """Runs validated SQL with a row cap and a statement timeout.
+
+    Queries are rewritten to return at most ``max_rows + 1`` rows so the
+    warehouse never materializes an unbounded result and truncation is
+    detectable. A timer cancels statements that outlive ``sql_timeout``.
+    With ``SQL_RESULT_FORMAT=arrow`` (and ``pyarrow`` installed) results are
+    fetched as Arrow batches and returned as :class:`ColumnarRows`.
+    """
+
     def __init__(self) -> None:
         self.settings = get_settings()
+        self.pool = get_connection_pool()
+        self.arrow = self.settings.sql_result_format.lower() == "arrow" and _HAS_PYARROW
+
+    @contextmanager
+    def _deadline(self, cursor: Any, scope: Optional[CancelScope]) -> Iterator[None]:
+        """Cancel ``cursor`` if the block outlives ``sql_timeout`` and map the resulting errors."""
+        timed_out = threading.Event()
 
-    def _connect(self):
-        return dbsql.connect(
-            server_hostname=self.settings.databricks_host,
-            http_path=self.settings.databricks_http_path,
-            access_token=self.settings.databricks_pat,
-        )
+        def cancel() -> None:
+            timed_out.set()
+            cursor.cancel()
 
-    def execute(self, sql_text: str) -> List[Dict[str, Any]]:
-        with self._connect() as connection:
+        timer = threading.Timer(self.settings.sql_timeout, cancel)
+        timer.daemon = True
+        timer.start()
+        try:
+            yield
+        except Exception as exc:
+            if timed_out.is_set():
+                raise QueryTimeout(f"Query exceeded the {self.settings.sql_timeout}s timeout and was cancelled") from exc
+            if scope is not None and scope.cancelled:
+                raise QueryCancelled("Query was cancelled") from exc
+            raise
+        finally:
+            timer.cancel()
+
+    def execute(self, sql_text: str, summary: Optional[StatementSummary] = None) -> Union[QueryRows, ColumnarRows]:
+        max_rows = self.settings.max_rows
+        if summary is None:
+            summary = ensure_select_only(sql_text)
+        limited_sql = limit_sql(sql_text, summary, max_rows + 1)
+        scope = _current_scope.get()
+        with self.pool.connection() as connection:
             with closing(connection.cursor()) as cursor:
-                cursor.execute(sql_text)
-                rows = cursor.fetchmany(self.settings.max_rows)
+                with scope.track(cursor) if scope is not None else nullcontext():
+                    with self._deadline(cursor, scope):
+                        cursor.execute(limited_sql)
+                        if self.arrow:
+                            return ColumnarRows.from_arrow(cursor.fetchmany_arrow(max_rows + 1), max_rows)
+                        rows = cursor.fetchmany(max_rows + 1)
                 description = cursor.description or []
         columns = [col[0] for col in description]
         dict_rows = [dict(zip(columns, row)) for row in rows]
-        return summarize_rows(dict_rows, self.settings.max_rows)
+        return QueryRows(summarize_rows(dict_rows, max_rows), truncated=len(dict_rows) > max_rows)
+
+    def explain(self, sql_text: str) -> None:
+        """Dry-run ``sql_text`` with ``EXPLAIN``, under the same timeout and cancel scope as :meth:`execute`."""
+        scope = _current_scope.get()
+        with self.pool.connection() as connection:
+            with closing(connection.cursor()) as cursor:
+                with scope.track(cursor) if scope is not None else nullcontext():
+                    with self._deadline(cursor, scope):
+                        cursor.execute(f"EXPLAIN \n{sql_text}")
+                        cursor.fetchall()
+
+    def export(self, sql_text: str, fmt: str, row_limit: Optional[int] = None) -> Iterator[bytes]:
+        """Run ``sql_text`` and yield the full result encoded as ``fmt``, one chunk per fetched batch.
+
+        Rows are capped at ``row_limit`` (at most ``export_max_rows``) instead
+        of ``max_rows``, and only one batch of ``export_batch_rows`` rows is in
+        memory at a time. The timeout covers running the statement, not the
+        download. Parquet needs ``pyarrow``; CSV falls back to row tuples.
+        """
+        if fmt not in EXPORT_MEDIA_TYPES:
+            raise ExportFormatError(f"Unsupported export format: {fmt}")
+        if fmt == "parquet" and not _HAS_PYARROW:
+            raise ExportFormatError("Parquet export requires pyarrow")
+        max_rows = self.settings.export_max_rows
+        row_limit = min(row_limit or max_rows, max_rows)
+        batch_rows = self.settings.export_batch_rows
+        limited_sql = limit_sql(sql_text, ensure_select_only(sql_text), row_limit)
+        scope = _current_scope.get()
+        with self.pool.connection() as connection:
+            with closing(connection.cursor()) as cursor:
+                with scope.track(cursor) if scope is not None else nullcontext():
+                    with self._deadline(cursor, scope):
+                        cursor.execute(limited_sql)
+
+                    def batches(fetch: Callable[[int], Any]) -> Iterator[Any]:
+                        while True:
+                            batch = fetch(batch_rows)
+                            yield batch
+                            if len(batch) < batch_rows:
+                                return
+
+                    if _HAS_PYARROW:
+                        yield from encode_arrow_batches(batches(cursor.fetchmany_arrow), fmt)
+                    else:
+                        columns = [col[0] for col in cursor.description or []]
+                        yield from encode_csv_rows(columns, batches(cursor.fetchmany))
+
+    async def aexecute(
+        self, sql_text: str, summary: Optional[StatementSummary] = None
+    ) -> Union[QueryRows, ColumnarRows]:
+        scope = CancelScope()
+        try:
+            return await run_in_sql_executor(scope.run, self.execute, sql_text, summary)
+        except asyncio.CancelledError:
+            scope.cancel()
+            raise
+
+    async def aexport(self, sql_text: str, fmt: str, row_limit: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Async view of :meth:`export` that pulls each chunk on the SQL thread pool.
+
+        If the consumer stops early (client disconnect), the running statement
+        is cancelled and the cursor and connection are released.
+        """
+        scope = CancelScope()
+        chunks = self.export(sql_text, fmt, row_limit)
+        pending: Optional["Future[Optional[bytes]]"] = None
+        try:
+            while True:
+                pending = get_sql_executor().submit(scope.run, next, chunks, None)
+                chunk = await asyncio.wrap_future(pending)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            scope.cancel()
+
+            def close(_: Any = None) -> None:
+                # Closing the cursor and returning the connection blocks, so keep it off the loop.
+                try:
+                    get_sql_executor().submit(chunks.close)
+                except RuntimeError:  # executor already shut down
+                    chunks.close()
+
+            if pending is None:
+                close()
+            else:
+                # A generator cannot be closed while another thread is running it,
+                # so wait for any in-flight fetch to finish first.
+                pending.add_done_callback(close)
 
 
-__all__ = ["DatabricksExecutor"]
+__all__ = [
+    "CancelScope",
+    "ColumnarRows",
+    "DatabricksExecutor",
+    "ExportFormatError",
+    "QueryCancelled",
+    "QueryRows",
+    "QueryTimeout",
+    "get_sql_executor",
+    "run_in_sql_executor",
+]
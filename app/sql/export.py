@@ -0,0 +1,94 @@
+"""Incremental CSV and Parquet encoders for streamed query exports."""
+from __future__ import annotations
+
+import csv
+import io
+from typing import Any, Iterable, Iterator, List, Sequence
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportFormatError(ValueError):
+    """The requested export format is unknown or needs an unavailable dependency."""
+
+
+class _ChunkSink:
+    """Write-only file object whose buffered bytes are handed off after each batch.
+
+    ``tell`` reports the total written so far, which the Parquet writer needs
+    for its footer offsets even though earlier bytes are already gone.
+    """
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: Any) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        return None
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def encode_arrow_batches(batches: Iterable[Any], fmt: str) -> Iterator[bytes]:
+    """Encode ``pyarrow.Table`` batches as ``fmt``, yielding one chunk per batch.
+
+    Only the current batch and its encoded bytes are held in memory; Parquet
+    output gets one row group per batch.
+    """
+    sink = _ChunkSink()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = _arrow_writer(sink, batch.schema, fmt)
+        writer.write_table(batch)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def _arrow_writer(sink: _ChunkSink, schema: Any, fmt: str) -> Any:
+    if fmt == "csv":
+        import pyarrow.csv
+
+        return pyarrow.csv.CSVWriter(sink, schema)
+    if fmt == "parquet":
+        import pyarrow.parquet
+
+        return pyarrow.parquet.ParquetWriter(sink, schema)
+    raise ExportFormatError(f"Unsupported export format: {fmt}")
+
+
+def encode_csv_rows(columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    """CSV fallback for plain row tuples when ``pyarrow`` is not installed."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+__all__ = ["EXPORT_MEDIA_TYPES", "ExportFormatError", "encode_arrow_batches", "encode_csv_rows"]
@@ -0,0 +1,56 @@
+"""Single-pass tokenizer for Databricks SQL."""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List
+
+_TOKEN = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+    |(?P<quoted>`(?:[^`]|``)*`)
+    |(?P<unterminated>['"`].*|/\*.*)
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?[A-Za-z]*)
+    |(?P<word>[A-Za-z_][A-Za-z_0-9]*)
+    |(?P<punct>[(),;.])
+    |(?P<op>->|::|<=>|<=|>=|<>|!=|\|\||&&|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str  # word, quoted, string, number, punct, op, or unterminated
+    text: str
+    pos: int
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper() if self.kind == "word" else ""
+
+    @property
+    def name(self) -> str:
+        """Identifier value: backticks removed, case folded (Unity names are case-insensitive)."""
+        if self.kind == "quoted":
+            return self.text[1:-1].replace("``", "`").lower()
+        return self.text.lower()
+
+    def is_word(self, *words: str) -> bool:
+        return self.kind == "word" and self.upper in words
+
+
+def tokenize(sql_text: str) -> List[Token]:
+    """Split ``sql_text`` into tokens, dropping whitespace and comments."""
+    tokens: List[Token] = []
+    for match in _TOKEN.finditer(sql_text):
+        kind = match.lastgroup or "op"
+        if kind in ("ws", "comment"):
+            continue
+        tokens.append(Token(kind, match.group(), match.start()))
+    return tokens
+
+
+__all__ = ["Token", "tokenize"]
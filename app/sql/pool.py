@@ -0,0 +1,273 @@
+"""Connection pool for Databricks SQL warehouse sessions."""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.sql.dbsql import dbsql
+
+from app.config import get_settings
+
+
+# Failures of one statement (bad SQL, missing table, local validation) that leave the session usable.
+STATEMENT_ERRORS = (dbsql.ServerOperationError, dbsql.ProgrammingError, ValueError)  # type: ignore[attr-defined]
+
+
+class PoolUnavailable(RuntimeError):
+    """No connection could be handed out: the pool is closed or stayed exhausted past its acquire timeout."""
+
+
+class _PooledConnection:
+    __slots__ = ("raw", "created_at", "last_used", "suspect")
+
+    def __init__(self, raw: Any) -> None:
+        now = time.monotonic()
+        self.raw = raw
+        self.created_at = now
+        self.last_used = now
+        # Set after a connector error that may have broken the session; forces a health check.
+        self.suspect = False
+
+
+class _Session:
+    __slots__ = ("pooled", "healthy")
+
+    def __init__(self) -> None:
+        self.pooled: Optional[_PooledConnection] = None
+        self.healthy = True
+
+
+class ConnectionPool:
+    """Thread-safe pool that hands out warm warehouse connections.
+
+    Idle connections are reused most-recently-used first so a burst of calls
+    (EXPLAIN followed by the query) lands on the same session. Connections are
+    dropped when they exceed ``max_age_seconds``, sit idle longer than
+    ``idle_seconds`` (above ``min_size``), or fail the checkout health check.
+    Inside :meth:`session`, every :meth:`connection` call on that thread
+    shares one connection.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 8,
+        idle_seconds: float = 300,
+        max_age_seconds: float = 3600,
+        validate_after_seconds: float = 30,
+        acquire_timeout: float = 30,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.max_age_seconds = max_age_seconds
+        self.validate_after_seconds = validate_after_seconds
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[_PooledConnection] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def _expired(self, pooled: _PooledConnection, now: float) -> bool:
+        return now - pooled.created_at > self.max_age_seconds
+
+    def _healthy(self, pooled: _PooledConnection, now: float) -> bool:
+        if not getattr(pooled.raw, "open", True):
+            return False
+        if not pooled.suspect and now - pooled.last_used < self.validate_after_seconds:
+            return True
+        try:
+            with closing(pooled.raw.cursor()) as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+        except Exception:  # noqa: BLE001 - any failure means the session is unusable
+            return False
+        pooled.suspect = False
+        return True
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        try:
+            pooled.raw.close()
+        except Exception:  # noqa: BLE001 - closing a dead session may fail
+            pass
+
+    def _open(self) -> _PooledConnection:
+        try:
+            return _PooledConnection(self._connect())
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def _checkout(self) -> _PooledConnection:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolUnavailable("Connection pool is closed")
+                candidate: Optional[_PooledConnection] = None
+                if self._idle:
+                    candidate = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolUnavailable("Timed out waiting for a Databricks connection")
+                    self._cond.wait(remaining)
+                    continue
+            if candidate is None:
+                return self._open()
+            now = time.monotonic()
+            if self._expired(candidate, now) or not self._healthy(candidate, now):
+                self._discard(candidate)
+                continue
+            return candidate
+
+    def _checkin(self, pooled: _PooledConnection, healthy: bool) -> None:
+        now = time.monotonic()
+        if not healthy or self._closed or self._expired(pooled, now):
+            self._discard(pooled)
+            return
+        pooled.last_used = now
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+        self.prune()
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """Pin one connection to this thread for the ``with`` block.
+
+        The connection is checked out lazily by the first :meth:`connection`
+        call and returned to the pool when the block exits; nested sessions
+        join the outer one.
+        """
+        if getattr(self._local, "session", None) is not None:
+            yield
+            return
+        state = _Session()
+        self._local.session = state
+        try:
+            yield
+        finally:
+            self._local.session = None
+            if state.pooled is not None:
+                self._checkin(state.pooled, state.healthy)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection for the duration of the ``with`` block."""
+        state: Optional[_Session] = getattr(self._local, "session", None)
+        if state is not None:
+            if state.pooled is not None and state.pooled.suspect:
+                state.healthy = state.healthy and self._healthy(state.pooled, time.monotonic())
+            if state.pooled is None or not state.healthy:
+                if state.pooled is not None:
+                    self._discard(state.pooled)
+                state.pooled, state.healthy = self._checkout(), True
+            try:
+                yield state.pooled.raw
+            except STATEMENT_ERRORS:
+                raise
+            except dbsql.Error:  # type: ignore[attr-defined]
+                state.pooled.suspect = True
+                raise
+            except BaseException:
+                state.healthy = False
+                raise
+            return
+        pooled = self._checkout()
+        healthy = True
+        try:
+            yield pooled.raw
+        except STATEMENT_ERRORS:
+            raise
+        except dbsql.Error:  # type: ignore[attr-defined]
+            # Transport, session or driver errors: revalidate before the next checkout.
+            pooled.suspect = True
+            raise
+        except BaseException:
+            healthy = False
+            raise
+        finally:
+            self._checkin(pooled, healthy)
+
+    def prune(self) -> None:
+        """Close idle connections that are too old or idle beyond ``min_size``."""
+        now = time.monotonic()
+        evicted: List[_PooledConnection] = []
+        with self._cond:
+            keep: List[_PooledConnection] = []
+            # Oldest idle connections sit at the front of the list.
+            for pooled in self._idle:
+                idle_too_long = now - pooled.last_used > self.idle_seconds
+                if self._expired(pooled, now) or (idle_too_long and self._size - len(evicted) > self.min_size):
+                    evicted.append(pooled)
+                else:
+                    keep.append(pooled)
+            self._idle = keep
+        for pooled in evicted:
+            self._discard(pooled)
+
+    def warm(self) -> None:
+        """Open connections until ``min_size`` sessions are available."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            pooled = self._open()
+            with self._cond:
+                self._idle.insert(0, pooled)
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "in_use": self._size - len(self._idle)}
+
+
+@lru_cache()
+def get_connection_pool() -> ConnectionPool:
+    settings = get_settings()
+
+    def connect() -> Any:
+        return dbsql.connect(
+            server_hostname=settings.databricks_host,
+            http_path=settings.databricks_http_path,
+            access_token=settings.databricks_pat,
+            # Server-side backstop for the client-side cancel in DatabricksExecutor.
+            session_configuration={"STATEMENT_TIMEOUT": str(settings.sql_timeout)},
+        )
+
+    return ConnectionPool(
+        connect,
+        min_size=settings.sql_pool_min_size,
+        max_size=settings.sql_pool_max_size,
+        idle_seconds=settings.sql_pool_idle_seconds,
+        max_age_seconds=settings.sql_pool_max_age_seconds,
+        validate_after_seconds=settings.sql_pool_validate_after_seconds,
+        acquire_timeout=settings.sql_pool_acquire_timeout,
+    )
+
+
+__all__ = ["STATEMENT_ERRORS", "ConnectionPool", "PoolUnavailable", "get_connection_pool"]
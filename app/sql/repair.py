@@ -1,8 +1,9 @@
 """SQL repair loop that retries on errors."""
 from __future__ import annotations
 
-import json
-from typing import List, Tuple
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
 
 from app.sql.dbsql import dbsql
 
@@ -10,42 +11,109 @@ from app.config import get_settings
 from app.llm.prompts import repair_prompt
 from app.llm.provider import LLMProvider
 from app.llm.planner import PlanResult
-from app.sql.executor import DatabricksExecutor
-from app.sql.validate import ensure_select_only, dry_run
+from app.schema.unity import UnityCatalogClient
+from app.sql.analyze import CatalogLookup, validate_locally
+from app.sql.executor import CancelScope, DatabricksExecutor, run_in_sql_executor
+from app.sql.validate import StatementSummary, ensure_select_only
+
+RETRYABLE_ERRORS = (dbsql.DatabaseError, dbsql.Error, ValueError)  # type: ignore[attr-defined]
+VALIDATION_MODES = ("explain", "local", "hybrid")
 
 
 class SQLRepairExecutor:
-    def __init__(self, llm: LLMProvider, executor: DatabricksExecutor) -> None:
+    """Validates, executes and, on failure, asks the LLM to repair generated SQL.
+
+    ``SQL_VALIDATION_MODE`` picks how SQL is checked before it runs:
+    ``explain`` always issues ``EXPLAIN``; ``local`` only resolves tables and
+    columns against cached Unity Catalog metadata; ``hybrid`` (the default)
+    analyzes locally and issues ``EXPLAIN`` only when the analysis is
+    inconclusive. Unknown tables or columns found locally go straight to the
+    repair prompt. ``EXPLAIN`` and the query share one pooled session.
+    """
+
+    def __init__(
+        self,
+        llm: LLMProvider,
+        executor: DatabricksExecutor,
+        unity_client: Optional[UnityCatalogClient] = None,
+    ) -> None:
         self.llm = llm
         self.executor = executor
+        self.unity_client = unity_client
         self.settings = get_settings()
         self.max_retries = 2
+        self.validation_mode = self.settings.sql_validation_mode.lower()
+        if self.validation_mode not in VALIDATION_MODES:
+            raise ValueError(f"Unsupported SQL validation mode: {self.validation_mode}")
+
+    def _repair_prompt(self, question: str, plan: PlanResult, sql_text: str, exc: Exception) -> str:
+        return repair_prompt(
+            question=question,
+            schema_context=plan.schema_context,
+            error_message=str(exc),
+            previous_sql=sql_text,
+            max_rows=self.settings.max_rows,
+        )
+
+    @staticmethod
+    def _apply_repair(response: Dict[str, Any], sql_text: str, fields: List[str]) -> Tuple[str, List[str]]:
+        return response.get("sql", sql_text), response.get("fields_used", fields)
+
+    def _needs_explain(self, sql_text: str, summary: StatementSummary) -> bool:
+        if self.validation_mode == "explain":
+            return True
+        validated = False
+        if self.unity_client is not None:
+            lookup = self.unity_client.derived("sql_catalog", CatalogLookup)
+            validated = validate_locally(sql_text, lookup, summary.tokens)
+        return not validated and self.validation_mode == "hybrid"
+
+    def _validate_and_execute(self, sql_text: str, summary: StatementSummary) -> List[dict]:
+        pool = getattr(self.executor, "pool", None)
+        with pool.session() if pool is not None else nullcontext():
+            if self._needs_explain(sql_text, summary):
+                self.executor.explain(sql_text)
+            return self.executor.execute(sql_text, summary)
 
     def run(self, question: str, plan: PlanResult) -> Tuple[str, List[str], List[dict]]:
         sql_text = plan.sql
         fields = plan.fields_used
         for attempt in range(self.max_retries + 1):
-            ensure_select_only(sql_text)
+            summary = ensure_select_only(sql_text)
+            try:
+                rows = self._validate_and_execute(sql_text, summary)
+                return sql_text, fields, rows
+            except RETRYABLE_ERRORS as exc:
+                if attempt == self.max_retries:
+                    raise RuntimeError(f"SQL failed after retries: {exc}")
+                prompt = self._repair_prompt(question, plan, sql_text, exc)
+                response = self.llm.complete(prompt)
+                sql_text, fields = self._apply_repair(response, sql_text, fields)
+        raise RuntimeError("Repair loop exhausted")
+
+    async def arun(self, question: str, plan: PlanResult) -> Tuple[str, List[str], List[dict]]:
+        scope = CancelScope()
+        try:
+            return await self._arun(question, plan, scope)
+        except asyncio.CancelledError:
+            # The caller went away; stop whatever is still running on the warehouse.
+            scope.cancel()
+            raise
+
+    async def _arun(self, question: str, plan: PlanResult, scope: CancelScope) -> Tuple[str, List[str], List[dict]]:
+        sql_text = plan.sql
+        fields = plan.fields_used
+        for attempt in range(self.max_retries + 1):
+            summary = ensure_select_only(sql_text)
             try:
-                dry_run(sql_text)
-                rows = self.executor.execute(sql_text)
+                rows = await run_in_sql_executor(scope.run, self._validate_and_execute, sql_text, summary)
                 return sql_text, fields, rows
-            except (dbsql.DatabaseError, dbsql.Error, ValueError) as exc:  # type: ignore[attr-defined]
+            except RETRYABLE_ERRORS as exc:
                 if attempt == self.max_retries:
                     raise RuntimeError(f"SQL failed after retries: {exc}")
-                prompt = repair_prompt(
-                    question=question,
-                    schema_context=plan.schema_context,
-                    error_message=str(exc),
-                    previous_sql=sql_text,
-                    max_rows=self.settings.max_rows,
-                )
-                try:
-                    response = self.llm.complete(prompt)
-                except json.JSONDecodeError:
-                    response = self.llm.complete(prompt + "\nReturn JSON only.")
-                sql_text = response.get("sql", sql_text)
-                fields = response.get("fields_used", fields)
+                prompt = self._repair_prompt(question, plan, sql_text, exc)
+                response = await self.llm.acomplete(prompt)
+                sql_text, fields = self._apply_repair(response, sql_text, fields)
         raise RuntimeError("Repair loop exhausted")
 
 
@@ -0,0 +1,72 @@
+"""Query result containers shared by execution, charting and the API layer."""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+
+
+class QueryRows(list):
+    """Result rows plus whether the row cap cut the result short."""
+
+    def __init__(self, rows: Iterable[Dict[str, Any]] = (), truncated: bool = False) -> None:
+        super().__init__(rows)
+        self.truncated = truncated
+
+
+class ColumnarRows(Sequence[Dict[str, Any]]):
+    """Column-oriented result that still reads like a list of row dicts.
+
+    Values are held as one list per column (as fetched from Arrow batches);
+    indexing or iterating builds row dicts on demand, so code that only needs
+    a few rows or whole columns never materializes the full row form.
+    """
+
+    def __init__(self, columns: Dict[str, List[Any]], truncated: bool = False) -> None:
+        self.columns = columns
+        self.truncated = truncated
+        self._length = len(next(iter(columns.values()), []))
+
+    @classmethod
+    def from_arrow(cls, table: Any, limit: int) -> "ColumnarRows":
+        """Build from a ``pyarrow.Table``, keeping at most ``limit`` rows."""
+        return cls(table.slice(0, limit).to_pydict(), truncated=table.num_rows > limit)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], "ColumnarRows"]:
+        if isinstance(index, slice):
+            return ColumnarRows({name: values[index] for name, values in self.columns.items()}, self.truncated)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("row index out of range")
+        return {name: values[index] for name, values in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        names = list(self.columns)
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, values))
+
+    def column(self, name: str) -> List[Any]:
+        return self.columns[name]
+
+
+def column_values(rows: Sequence[Dict[str, Any]], name: str) -> List[Any]:
+    """All values of one column, without building row dicts for columnar results."""
+    if isinstance(rows, ColumnarRows):
+        return rows.column(name)
+    return [row[name] for row in rows]
+
+
+def as_row_dicts(rows: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return rows if isinstance(rows, list) else list(rows)
+
+
+def as_columns(rows: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    if isinstance(rows, ColumnarRows):
+        return rows.columns
+    names = list(rows[0]) if rows else []
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+__all__ = ["ColumnarRows", "QueryRows", "as_columns", "as_row_dicts", "column_values"]
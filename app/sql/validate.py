@@ -1,36 +1,89 @@
 """SQL validation utilities."""
 from __future__ import annotations
 
-import re
 from contextlib import closing
+from dataclasses import dataclass
+from typing import Optional, Tuple
 
-from app.sql.dbsql import dbsql
+from app.sql.analyze import definition_indices, scan_tables
+from app.sql.lexer import Token, tokenize
+from app.sql.pool import get_connection_pool
 
-from app.config import get_settings
+FORBIDDEN_KEYWORDS = frozenset(["UPDATE", "DELETE", "INSERT", "TRUNCATE", "CREATE", "ALTER", "DROP"])
 
-FORBIDDEN_KEYWORDS = ["UPDATE", "DELETE", "INSERT", "TRUNCATE", "CREATE", "ALTER", "DROP"]
 
+@dataclass(frozen=True)
+class StatementSummary:
+    """What later stages need to know about a validated statement, from one tokenizer pass."""
 
-def ensure_select_only(sql_text: str) -> None:
-    normalized = sql_text.strip().upper()
-    if not normalized.startswith("SELECT") and not normalized.startswith("WITH"):
+    tokens: Tuple[Token, ...]
+    tables: Tuple[str, ...]
+    has_limit: bool
+    limit: Optional[int] = None
+
+
+def ensure_select_only(sql_text: str) -> StatementSummary:
+    """Reject anything but a single read-only query.
+
+    Keywords inside string literals, comments, quoted identifiers, or used as
+    qualified column names (``t.update``) are ignored.
+    """
+    tokens = tuple(tokenize(sql_text))
+    if not tokens or not tokens[0].is_word("SELECT", "WITH"):
         raise ValueError("Only SELECT statements are allowed")
-    for keyword in FORBIDDEN_KEYWORDS:
-        if re.search(rf"\b{keyword}\b", normalized):
-            raise ValueError(f"Forbidden keyword detected: {keyword}")
+    depth = 0
+    limit_at: Optional[int] = None
+    for i, token in enumerate(tokens):
+        if token.kind == "unterminated":
+            raise ValueError("Unterminated string literal, identifier, or comment")
+        if token.text == ";":
+            if i != len(tokens) - 1:
+                raise ValueError("Multiple statements are not allowed")
+            tokens = tokens[:-1]
+        elif token.text == "(":
+            depth += 1
+        elif token.text == ")":
+            depth -= 1
+        elif token.kind == "word" and token.upper in FORBIDDEN_KEYWORDS:
+            qualified = (i and tokens[i - 1].text == ".") or (i + 1 < len(tokens) and tokens[i + 1].text == ".")
+            if not qualified:
+                raise ValueError(f"Forbidden keyword detected: {token.upper}")
+        elif token.is_word("LIMIT") and depth == 0:
+            limit_at = i
+    limit = None
+    if limit_at is not None and limit_at + 1 < len(tokens) and tokens[limit_at + 1].text.isdigit():
+        limit = int(tokens[limit_at + 1].text)
+    references, _ = scan_tables(tokens)
+    ctes = {tokens[i].name for i in definition_indices(tokens)}
+    tables = tuple(
+        dict.fromkeys(
+            ".".join(reference.parts) for reference in references if not (len(reference.parts) == 1 and reference.parts[0] in ctes)
+        )
+    )
+    return StatementSummary(tokens=tokens, tables=tables, has_limit=limit_at is not None, limit=limit)
+
+
+def limit_sql(sql_text: str, summary: StatementSummary, row_limit: int) -> str:
+    """Cap ``sql_text`` at ``row_limit`` rows so the warehouse never computes an unbounded result.
+
+    A missing top-level LIMIT is appended; a larger or non-literal one is
+    wrapped in an outer query. Trailing semicolons and comments are dropped.
+    """
+    if summary.has_limit and summary.limit is not None and summary.limit <= row_limit:
+        return sql_text
+    last = summary.tokens[-1]
+    body = sql_text[: last.pos + len(last.text)]
+    if not summary.has_limit:
+        return f"{body}\nLIMIT {row_limit}"
+    return f"SELECT * FROM (\n{body}\n) AS _limited\nLIMIT {row_limit}"
 
 
 def dry_run(sql_text: str) -> None:
-    settings = get_settings()
     explain_query = f"EXPLAIN \n{sql_text}"
-    with dbsql.connect(
-        server_hostname=settings.databricks_host,
-        http_path=settings.databricks_http_path,
-        access_token=settings.databricks_pat,
-    ) as connection:
+    with get_connection_pool().connection() as connection:
         with closing(connection.cursor()) as cursor:
             cursor.execute(explain_query)
             cursor.fetchall()
 
 
-__all__ = ["ensure_select_only", "dry_run"]
+__all__ = ["StatementSummary", "ensure_select_only", "limit_sql", "dry_run"]
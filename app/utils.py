@@ -1,51 +1,37 @@
 """Utility helpers for logging, caching, and formatting."""
 from __future__ import annotations
 
-import base64
+import hashlib
 import json
 import logging
-from datetime import datetime, timedelta
-from io import BytesIO
 from pathlib import Path
-from typing import Any, Callable, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Optional
 
 from fastapi import Request
+from fastapi.encoders import jsonable_encoder
 
+from app.cache import BoundedTTLCache, CacheBackend, SingleFlight, build_answer_cache, build_query_store
 from app.config import get_settings
+from app.viz.draw import encode_plot
 
 logger = logging.getLogger("nl2sql")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 
-class TTLCache:
-    """A minimal in-memory TTL cache suitable for small datasets."""
-
-    def __init__(self, ttl_seconds: int) -> None:
-        self.ttl = timedelta(seconds=ttl_seconds)
-        self._store: Dict[str, Tuple[datetime, Any]] = {}
-
-    def get(self, key: str) -> Optional[Any]:
-        record = self._store.get(key)
-        if not record:
-            return None
-        ts, value = record
-        if datetime.utcnow() - ts > self.ttl:
-            self._store.pop(key, None)
-            return None
-        return value
-
-    def set(self, key: str, value: Any) -> None:
-        self._store[key] = (datetime.utcnow(), value)
-
-    def clear(self) -> None:
-        self._store.clear()
+# Retained name for callers that predate the bounded cache; with no limits it
+# behaves like the original unbounded TTL map.
+TTLCache = BoundedTTLCache
 
 
 _settings = get_settings()
-question_cache = TTLCache(ttl_seconds=_settings.question_cache_ttl_seconds)
+question_cache = build_answer_cache(_settings)
+# Identical in-flight /ask requests share one planner/warehouse run.
+question_flights = SingleFlight()
+# Final SQL of answered questions, keyed by query_id, for full-result exports.
+query_store = build_query_store(_settings)
 
 
-def cache_with_ttl(cache: TTLCache) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+def cache_with_ttl(cache: CacheBackend) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
     def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
         def wrapper(*args: Any, **kwargs: Any) -> Any:
             key = json.dumps({"args": args, "kwargs": kwargs}, sort_keys=True, default=str)
@@ -61,13 +47,6 @@ def cache_with_ttl(cache: TTLCache) -> Callable[[Callable[..., Any]], Callable[.
     return decorator
 
 
-def encode_plot(fig) -> str:
-    buffer = BytesIO()
-    fig.savefig(buffer, format="png", bbox_inches="tight")
-    buffer.seek(0)
-    return base64.b64encode(buffer.read()).decode("utf-8")
-
-
 def ensure_feedback_file(path: str) -> Path:
     target = Path(path)
     target.parent.mkdir(parents=True, exist_ok=True)
@@ -90,21 +69,38 @@ def summarize_rows(rows: list[dict[str, Any]], max_rows: int) -> list[dict[str,
     return rows[:max_rows]
 
 
-def format_answer_summary(question: str, rows: list[dict[str, Any]]) -> str:
+def format_answer_summary(question: str, rows: list[dict[str, Any]], truncated: bool = False) -> str:
     if not rows:
         return "No rows were returned. Consider adjusting your filters."
     sample = rows[0]
     fields = ", ".join(sample.keys())
-    return f"The query answered '{question}' and returned {len(rows)} row(s) with fields: {fields}."
+    summary = f"The query answered '{question}' and returned {len(rows)} row(s) with fields: {fields}."
+    if truncated:
+        summary += f" Results were truncated to the first {len(rows)} rows."
+    return summary
+
+
+def query_id_for(sql: str) -> str:
+    """Stable id for a final SQL statement, identical across workers."""
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()[:16]
 
 
 def extract_user_agent(request: Request) -> Optional[str]:
     return request.headers.get("user-agent")
 
 
+def format_sse(event: str, data: Any) -> str:
+    """Encode one server-sent event; ``data`` is JSON-serialized onto a single line the way /ask encodes it."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
 __all__ = [
+    "BoundedTTLCache",
     "TTLCache",
     "question_cache",
+    "question_flights",
+    "query_store",
+    "query_id_for",
     "cache_with_ttl",
     "encode_plot",
     "ensure_feedback_file",
@@ -113,4 +109,5 @@ __all__ = [
     "summarize_rows",
     "format_answer_summary",
     "extract_user_agent",
+    "format_sse",
 ]
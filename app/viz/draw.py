@@ -0,0 +1,129 @@
+"""Chart drawing that runs inside render workers.
+
+Worker processes import only this module (and matplotlib or plotly), so it
+must stay free of import-time side effects: no logging setup, settings or
+cache construction.
+"""
+from __future__ import annotations
+
+import base64
+import threading
+from io import BytesIO
+from typing import Any, Dict, List, Sequence, Tuple
+
+from app.sql.results import ColumnarRows, as_columns, column_values
+
+_figures = threading.local()
+
+
+def init_worker() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def encode_plot(fig) -> str:
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    buffer.seek(0)
+    return base64.b64encode(buffer.read()).decode("utf-8")
+
+
+def _figure(figsize: Tuple[float, float]) -> Any:
+    """Reusable Agg-backed figure of ``figsize`` for the current thread (or worker process).
+
+    Built with the object-oriented API, so no pyplot global state is touched
+    and nothing is registered with a figure manager that could leak.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    cache: Dict[Tuple[float, float], Any] = _figures.__dict__.setdefault("by_size", {})
+    fig = cache.get(figsize)
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        cache[figsize] = fig
+    return fig
+
+
+def render_chart(engine: str, chart_type: str, spec: Dict[str, str], columns: Dict[str, List[Any]], title: str) -> str:
+    """Draw one chart and return it as base64 PNG; runs inside a render worker."""
+    rows = ColumnarRows(columns)
+    if engine == "plotly":
+        return _render_plotly(chart_type, spec, rows, title)
+    return _render_matplotlib(chart_type, spec, rows, title)
+
+
+def _render_matplotlib(chart_type: str, spec: Dict[str, str], rows: Sequence[Dict[str, Any]], title: str) -> str:
+    x_field = spec.get("x")
+    y_field = spec.get("y")
+    group_field = spec.get("group")
+    fig = _figure((4, 2) if chart_type == "kpi" and x_field else (6, 4))
+    try:
+        ax = fig.subplots()
+        if chart_type == "line" and x_field and y_field:
+            ax.plot(column_values(rows, x_field), column_values(rows, y_field), marker="o")
+            ax.set_xlabel(x_field)
+            ax.set_ylabel(y_field)
+        elif chart_type == "bar" and x_field and y_field:
+            labels = column_values(rows, x_field)
+            values = column_values(rows, y_field)
+            ax.bar(labels[:25], values[:25])
+            if len(labels) > 8:
+                ax.tick_params(axis="x", rotation=45)
+            ax.set_xlabel(x_field)
+            ax.set_ylabel(y_field)
+        elif chart_type == "pie" and x_field and y_field:
+            labels = column_values(rows, x_field)[:10]
+            values = column_values(rows, y_field)[:10]
+            ax.pie(values, labels=labels, autopct="%1.1f%%")
+        elif chart_type == "scatter" and x_field and y_field:
+            colors = None
+            if group_field:
+                groups = list(dict.fromkeys(column_values(rows, group_field)))
+                color_map = {group: idx for idx, group in enumerate(groups)}
+                colors = [color_map[group] for group in column_values(rows, group_field)]
+            ax.scatter(column_values(rows, x_field), column_values(rows, y_field), c=colors)
+            ax.set_xlabel(x_field)
+            ax.set_ylabel(y_field)
+        elif chart_type == "kpi" and x_field:
+            ax.axis("off")
+            value = rows[0].get(x_field, "-")
+            ax.text(0.5, 0.6, str(value), fontsize=28, ha="center")
+            ax.text(0.5, 0.2, x_field, fontsize=12, ha="center")
+        else:
+            ax.text(0.5, 0.5, "Chart not available", ha="center")
+        note = spec.get("note")
+        subtitle = f"\n{note}" if note else ""
+        ax.set_title(f"{title}{subtitle}")
+        return encode_plot(fig)
+    finally:
+        fig.clear()
+
+
+def _render_plotly(chart_type: str, spec: Dict[str, str], rows: Sequence[Dict[str, Any]], title: str) -> str:
+    import plotly.express as px
+
+    if chart_type == "line":
+        fig = px.line(as_columns(rows), x=spec.get("x"), y=spec.get("y"), title=title)
+    elif chart_type == "bar":
+        fig = px.bar(as_columns(rows), x=spec.get("x"), y=spec.get("y"), title=title)
+    elif chart_type == "pie":
+        fig = px.pie(as_columns(rows), names=spec.get("x"), values=spec.get("y"), title=title)
+    elif chart_type == "scatter":
+        fig = px.scatter(as_columns(rows), x=spec.get("x"), y=spec.get("y"), color=spec.get("group"), title=title)
+    else:
+        blank = _figure((4, 2) if chart_type == "kpi" else (6, 4))
+        try:
+            blank.subplots()
+            return encode_plot(blank)
+        finally:
+            blank.clear()
+    buffer = BytesIO()
+    fig.write_image(buffer, format="png")
+    buffer.seek(0)
+    return base64.b64encode(buffer.read()).decode("utf-8")
+
+
+__all__ = ["encode_plot", "init_worker", "render_chart"]
@@ -0,0 +1,101 @@
+"""Worker pool that keeps chart rendering off the event loop and request threads."""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from app.utils import logger
+from app.viz.draw import init_worker
+
+T = TypeVar("T")
+
+
+class RenderError(RuntimeError):
+    """A chart did not render in time or its worker process died."""
+
+
+class RenderPool:
+    """Runs render functions in ``workers`` spawned processes, each bounded by ``timeout`` seconds.
+
+    Processes sidestep matplotlib's global state and the GIL; they are spawned
+    rather than forked because the server process holds live threads and
+    sockets. With ``workers=0`` renders run on a small thread pool instead.
+    A render that overruns its timeout gets its workers replaced, since a
+    process pool cannot stop a single running task.
+    """
+
+    def __init__(self, workers: int, timeout: float) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.workers > 0:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=init_worker,
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="render")
+            return self._executor
+
+    def _submit(self, func: Callable[..., T], *args: Any) -> Tuple[Executor, "Future[T]"]:
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(func, *args)
+        except BrokenProcessPool:
+            # A worker died while idle; replace the pool and retry once.
+            self._reset(executor)
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(func, *args)
+        except BrokenProcessPool as exc:
+            self._reset(executor)
+            raise RenderError("Chart render workers could not be started") from exc
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        executor, future = self._submit(func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError as exc:
+            logger.warning("Chart render exceeded %ss; restarting render workers", self.timeout)
+            self._reset(executor)
+            raise RenderError(f"Chart rendering exceeded the {self.timeout}s timeout") from exc
+        except BrokenProcessPool as exc:
+            self._reset(executor)
+            raise RenderError("Chart render worker exited unexpectedly") from exc
+
+    def warm(self) -> None:
+        """Start the worker processes so the first chart does not pay for spawning them."""
+        executor = self._get_executor()
+        for _ in range(max(self.workers, 1)):
+            executor.submit(init_worker)
+
+    def _reset(self, executor: Executor) -> None:
+        """Tear down ``executor`` if it is still current; a newer pool is left alone."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        # ProcessPoolExecutor has no public way to stop a hung worker.
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def close(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = ["RenderError", "RenderPool"]
@@ -1,95 +1,89 @@
-"""Chart rendering using matplotlib or plotly."""
+"""Chart rendering on the worker pool, with a content-addressed image cache."""
 from __future__ import annotations
 
-import base64
-from io import BytesIO
-from typing import Dict, List
+import hashlib
+import json
+from typing import Any, Dict, List, Sequence
 
+from app.cache import BoundedTTLCache, SingleFlight
 from app.config import get_settings
-from app.utils import encode_plot
+from app.sql.results import as_columns
+from app.viz.draw import render_chart
+from app.viz.pool import RenderPool
+
+PLOTTED_FIELDS = ("x", "y", "group")
+
+
+def _tagged(value: Any) -> Any:
+    """JSON-native values as-is; anything else tagged with its type so ``Decimal("1")`` differs from ``"1"``."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return [type(value).__name__, str(value)]
+
+
+def render_cache_key(engine: str, chart_type: str, spec: Dict[str, str], columns: Dict[str, List[Any]], title: str) -> str:
+    """Content address of a chart: its spec and title plus a fingerprint of the plotted columns.
+
+    Only the spec's x/y/group columns are hashed, so results that differ in
+    columns the chart does not draw share a key.
+    """
+    plotted = [spec[field] for field in PLOTTED_FIELDS if spec.get(field)]
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([engine, chart_type, spec, title], sort_keys=True, default=str).encode("utf-8"))
+    for name in plotted:
+        values = [_tagged(value) for value in columns.get(name, [])]
+        digest.update(json.dumps([name, values], separators=(",", ":")).encode("utf-8"))
+    return digest.hexdigest()
 
 
 class ChartRenderer:
+    """Renders charts on a :class:`RenderPool` so drawing and PNG encoding never block requests.
+
+    Finished images are kept in a size-bounded LRU keyed by
+    :func:`render_cache_key`, and identical concurrent renders share one
+    worker call.
+    """
+
     def __init__(self) -> None:
         self.settings = get_settings()
         self.engine = self.settings.chart_engine.lower()
+        self.pool = RenderPool(self.settings.render_workers, self.settings.render_timeout)
+        self.cache = BoundedTTLCache(
+            ttl_seconds=self.settings.render_cache_ttl_seconds,
+            max_entries=self.settings.render_cache_max_entries,
+            max_bytes=self.settings.render_cache_max_bytes,
+            sizeof=len,
+        )
+        self.flights = SingleFlight()
+
+    def render(self, chart_type: str, spec: Dict[str, str], rows: Sequence[Dict[str, object]], title: str) -> str:
+        """Render in the calling thread (for scripts and tests)."""
+        columns = as_columns(rows)
+        key = render_cache_key(self.engine, chart_type, spec, columns, title)
+        image = self.cache.get(key)
+        if image is None:
+            image = render_chart(self.engine, chart_type, spec, columns, title)
+            self.cache.set(key, image)
+        return image
+
+    async def arender(self, chart_type: str, spec: Dict[str, str], rows: Sequence[Dict[str, object]], title: str) -> str:
+        """Render on the worker pool; raises :class:`~app.viz.pool.RenderError` on timeout."""
+        columns = as_columns(rows)
+        key = render_cache_key(self.engine, chart_type, spec, columns, title)
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+        return await self.flights.ado(key, lambda: self._render_and_store(key, chart_type, spec, columns, title))
+
+    async def _render_and_store(
+        self, key: str, chart_type: str, spec: Dict[str, str], columns: Dict[str, List[Any]], title: str
+    ) -> str:
+        image = await self.pool.run(render_chart, self.engine, chart_type, spec, columns, title)
+        self.cache.set(key, image)
+        return image
+
+    def close(self) -> None:
+        self.pool.close()
+
 
-    def render(self, chart_type: str, spec: Dict[str, str], rows: List[Dict[str, object]], title: str) -> str:
-        if self.engine == "plotly":
-            return self._render_plotly(chart_type, spec, rows, title)
-        return self._render_matplotlib(chart_type, spec, rows, title)
-
-    def _render_matplotlib(self, chart_type: str, spec: Dict[str, str], rows: List[Dict[str, object]], title: str) -> str:
-        import matplotlib.pyplot as plt
-
-        fig, ax = plt.subplots(figsize=(6, 4))
-        x_field = spec.get("x")
-        y_field = spec.get("y")
-        group_field = spec.get("group")
-        if chart_type == "line" and x_field and y_field:
-            ax.plot([row[x_field] for row in rows], [row[y_field] for row in rows], marker="o")
-            ax.set_xlabel(x_field)
-            ax.set_ylabel(y_field)
-        elif chart_type == "bar" and x_field and y_field:
-            labels = [row[x_field] for row in rows]
-            values = [row[y_field] for row in rows]
-            ax.bar(labels[:25], values[:25])
-            if len(labels) > 8:
-                ax.tick_params(axis="x", rotation=45)
-            ax.set_xlabel(x_field)
-            ax.set_ylabel(y_field)
-        elif chart_type == "pie" and x_field and y_field:
-            labels = [row[x_field] for row in rows][:10]
-            values = [row[y_field] for row in rows][:10]
-            ax.pie(values, labels=labels, autopct="%1.1f%%")
-        elif chart_type == "scatter" and x_field and y_field:
-            colors = None
-            if group_field:
-                groups = list({row[group_field] for row in rows})
-                color_map = {group: idx for idx, group in enumerate(groups)}
-                colors = [color_map[row[group_field]] for row in rows]
-            ax.scatter([row[x_field] for row in rows], [row[y_field] for row in rows], c=colors)
-            ax.set_xlabel(x_field)
-            ax.set_ylabel(y_field)
-        elif chart_type == "kpi" and x_field:
-            fig.clf()
-            fig, ax = plt.subplots(figsize=(4, 2))
-            ax.axis("off")
-            value = rows[0].get(x_field, "-")
-            ax.text(0.5, 0.6, str(value), fontsize=28, ha="center")
-            ax.text(0.5, 0.2, x_field, fontsize=12, ha="center")
-        else:
-            ax.text(0.5, 0.5, "Chart not available", ha="center")
-        note = spec.get("note")
-        subtitle = f"\n{note}" if note else ""
-        ax.set_title(f"{title}{subtitle}")
-        return encode_plot(fig)
-
-    def _render_plotly(self, chart_type: str, spec: Dict[str, str], rows: List[Dict[str, object]], title: str) -> str:
-        import plotly.express as px
-
-        if chart_type == "line":
-            fig = px.line(rows, x=spec.get("x"), y=spec.get("y"), title=title)
-        elif chart_type == "bar":
-            fig = px.bar(rows, x=spec.get("x"), y=spec.get("y"), title=title)
-        elif chart_type == "pie":
-            fig = px.pie(rows, names=spec.get("x"), values=spec.get("y"), title=title)
-        elif chart_type == "scatter":
-            fig = px.scatter(rows, x=spec.get("x"), y=spec.get("y"), color=spec.get("group"), title=title)
-        elif chart_type == "kpi":
-            import matplotlib.pyplot as plt
-
-            fig_mat, _ = plt.subplots(figsize=(4, 2))
-            return encode_plot(fig_mat)
-        else:
-            import matplotlib.pyplot as plt
-
-            fig_mat, _ = plt.subplots()
-            return encode_plot(fig_mat)
-        buffer = BytesIO()
-        fig.write_image(buffer, format="png")
-        buffer.seek(0)
-        return base64.b64encode(buffer.read()).decode("utf-8")
-
-
-__all__ = ["ChartRenderer"]
+__all__ = ["ChartRenderer", "render_cache_key", "render_chart"]
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 from typing import Dict, List, Optional, Tuple
 
+from app.sql.results import column_values
+
 ChartChoice = Tuple[str, Dict[str, str]]
 
 
@@ -56,7 +58,7 @@ def select_chart(rows: List[Dict[str, object]], preference: str = "auto") -> Opt
     if categorical_fields and numeric_fields:
         category = categorical_fields[0]
         note = None
-        if len({row[category] for row in rows}) > 25:
+        if len(set(column_values(rows, category))) > 25:
             note = "Showing top categories by metric"
         return build("bar", category, numeric_fields[0], note=note)
     if len(numeric_fields) >= 2 and categorical_fields:
@@ -0,0 +1,70 @@
+import pytest
+
+from app.schema.unity import Column, Table
+from app.sql.analyze import CatalogLookup, SQLAnalysisError, analyze, validate_locally
+
+
+def make_lookup():
+    def table(schema, name, columns):
+        return Table(
+            catalog="main",
+            schema=schema,
+            name=name,
+            columns=[Column(name=column, type="STRING", comment=None) for column in columns],
+            comment=None,
+        )
+
+    return CatalogLookup(
+        [
+            table("sales", "orders", ["id", "customer_id", "amount", "order_date"]),
+            table("sales", "customers", ["id", "name", "region"]),
+        ]
+    )
+
+
+def test_analyzer_resolves_aliases_and_output_names():
+    sql = (
+        "SELECT c.region, SUM(o.amount) total FROM main.sales.orders o "
+        "JOIN main.sales.customers AS c ON o.customer_id = c.id "
+        "WHERE EXTRACT(YEAR FROM o.order_date) = 2024 AND name <> 'UPDATE' "
+        "GROUP BY c.region ORDER BY total DESC"
+    )
+    analysis = analyze(sql, make_lookup())
+    assert analysis.issues == []
+    assert analysis.complete
+    assert analysis.tables == ["main.sales.orders", "main.sales.customers"]
+
+
+def test_analyzer_skips_typed_literal_prefixes():
+    sql = (
+        "SELECT id FROM main.sales.orders "
+        "WHERE order_date >= TIMESTAMP_NTZ '2024-01-01' AND amount <> X'0A' AND customer_id RLIKE r'\\d+'"
+    )
+    analysis = analyze(sql, make_lookup())
+    assert analysis.issues == []
+    assert analysis.complete
+
+
+def test_analyzer_reports_unknown_names_with_suggestions():
+    lookup = make_lookup()
+    with pytest.raises(SQLAnalysisError) as excinfo:
+        validate_locally("SELECT c.regoin FROM main.sales.customers c", lookup)
+    assert str(excinfo.value) == "Column `regoin` not found in main.sales.customers; did you mean `region`?"
+
+    analysis = analyze("SELECT amount FROM main.sales.order", lookup)
+    assert analysis.issues == ["Table or view not found: main.sales.order; did you mean main.sales.orders?"]
+
+    analysis = analyze("SELECT amout FROM main.sales.orders", lookup)
+    assert analysis.issues == ["Column `amout` not found in main.sales.orders; did you mean `amount`?"]
+
+
+def test_analyzer_defers_what_it_cannot_resolve():
+    lookup = make_lookup()
+    for sql in [
+        "WITH t AS (SELECT region FROM main.sales.customers) SELECT anything FROM t",
+        "SELECT s.x FROM (SELECT id AS x FROM main.sales.orders) s",
+        "SELECT * FROM other.schema.table",
+    ]:
+        analysis = analyze(sql, lookup)
+        assert analysis.issues == []
+        assert not analysis.complete
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from app.cache import BoundedTTLCache, SingleFlight, SQLiteCacheBackend
+
+
+def test_bounded_cache_evicts_least_recently_used():
+    cache = BoundedTTLCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_bounded_cache_enforces_byte_budget_and_ttl():
+    cache = BoundedTTLCache(ttl_seconds=0.05, max_bytes=100, sizeof=len)
+    cache.set("a", "x" * 60)
+    cache.set("b", "y" * 60)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 60
+    cache.set("huge", "z" * 500)
+    assert cache.get("huge") is None
+    time.sleep(0.06)
+    assert cache.sweep() == 1
+    assert len(cache) == 0
+
+
+def test_sqlite_backend_shares_entries_between_instances(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    writer = SQLiteCacheBackend(path, ttl_seconds=60)
+    reader = SQLiteCacheBackend(path, ttl_seconds=60)
+    payload = {"answer_text": "ok", "sampled_rows": [{"region": "EMEA", "arr": 1.5}]}
+    writer.set("question", payload)
+    assert reader.get("question") == payload
+    assert reader.get("other") is None
+    assert reader.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_sqlite_backend_returns_the_json_types_a_response_would(tmp_path):
+    cache = SQLiteCacheBackend(str(tmp_path / "answers.sqlite3"), ttl_seconds=60)
+    cache.set("question", {"sampled_rows": [{"arr": Decimal("12.50"), "at": datetime(2024, 1, 2, 3, 4, 5)}]})
+    assert cache.get("question") == {"sampled_rows": [{"arr": 12.5, "at": "2024-01-02T03:04:05"}]}
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"answer": 42}
+
+    async def burst():
+        return await asyncio.gather(*(flights.ado("same-question", work) for _ in range(5)))
+
+    results = asyncio.run(burst())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flights.in_flight() == 0
@@ -0,0 +1,139 @@
+import io
+import threading
+
+import pytest
+
+from app.config import get_settings
+from app.sql.executor import CancelScope, ColumnarRows, DatabricksExecutor, QueryCancelled, QueryTimeout
+
+
+class FakeCursor:
+    description = [("n",)]
+
+    def __init__(self, rows, block=False) -> None:
+        self.rows = rows
+        self.block = block
+        self.cancelled = threading.Event()
+        self.sql = None
+
+    def execute(self, sql_text):
+        self.sql = sql_text
+        if self.block and self.cancelled.wait(5):
+            raise RuntimeError("statement cancelled")
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def fetchmany_arrow(self, size):
+        import pyarrow as pa
+
+        return pa.table({"n": [row[0] for row in self.fetchmany(size)]})
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        return None
+
+
+class FakePool:
+    def __init__(self, cursor) -> None:
+        self.cursor = cursor
+
+    def connection(self):
+        pool = self
+
+        class _Connection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def cursor(self):
+                return pool.cursor
+
+        return _Connection()
+
+
+def make_executor(cursor, monkeypatch, **settings):
+    for key, value in settings.items():
+        monkeypatch.setenv(key, str(value))
+    get_settings.cache_clear()
+    executor = DatabricksExecutor()
+    executor.pool = FakePool(cursor)
+    get_settings.cache_clear()
+    return executor
+
+
+def test_execute_caps_rows_and_flags_truncation(monkeypatch):
+    cursor = FakeCursor([(i,) for i in range(10)])
+    rows = make_executor(cursor, monkeypatch, MAX_ROWS=3, SQL_RESULT_FORMAT="rows").execute("SELECT n FROM t")
+    assert cursor.sql == "SELECT n FROM t\nLIMIT 4"
+    assert rows == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert rows.truncated
+
+
+def test_arrow_mode_returns_columnar_rows(monkeypatch):
+    pytest.importorskip("pyarrow")
+    cursor = FakeCursor([(i,) for i in range(10)])
+    rows = make_executor(cursor, monkeypatch, MAX_ROWS=3, SQL_RESULT_FORMAT="arrow").execute("SELECT n FROM t")
+    assert isinstance(rows, ColumnarRows)
+    assert rows.columns == {"n": [0, 1, 2]}
+    assert rows.truncated
+    assert rows[1] == {"n": 1} and list(rows[:2]) == [{"n": 0}, {"n": 1}]
+
+
+def test_execute_cancels_statement_after_timeout(monkeypatch):
+    cursor = FakeCursor([], block=True)
+    executor = make_executor(cursor, monkeypatch, SQL_TIMEOUT=0)
+    with pytest.raises(QueryTimeout):
+        executor.execute("SELECT n FROM t LIMIT 1")
+    assert cursor.cancelled.is_set()
+
+
+def test_explain_is_bounded_by_timeout_and_cancel_scope(monkeypatch):
+    cursor = FakeCursor([], block=True)
+    with pytest.raises(QueryTimeout):
+        make_executor(cursor, monkeypatch, SQL_TIMEOUT=0).explain("SELECT n FROM t")
+    assert cursor.sql == "EXPLAIN \nSELECT n FROM t"
+
+    cursor = FakeCursor([], block=True)
+    executor = make_executor(cursor, monkeypatch, SQL_TIMEOUT=60)
+    scope = CancelScope()
+    errors = []
+
+    def explain():
+        try:
+            scope.run(executor.explain, "SELECT n FROM t")
+        except QueryCancelled as exc:
+            errors.append(exc)
+
+    worker = threading.Thread(target=explain)
+    worker.start()
+    while cursor.sql is None:
+        worker.join(0.01)
+    scope.cancel()
+    worker.join(5)
+    assert cursor.cancelled.is_set() and len(errors) == 1
+
+
+def test_export_streams_batches_with_export_row_cap(monkeypatch):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    cursor = FakeCursor([(i,) for i in range(5)])
+    executor = make_executor(cursor, monkeypatch, MAX_ROWS=1, EXPORT_MAX_ROWS=100, EXPORT_BATCH_ROWS=2)
+    chunks = list(executor.export("SELECT n FROM t", "csv", row_limit=1000))
+    assert cursor.sql == "SELECT n FROM t\nLIMIT 100"
+    assert b"".join(chunks) == b'"n"\n0\n1\n2\n3\n4\n'
+
+    executor.pool.cursor = FakeCursor([(i,) for i in range(5)])
+    data = b"".join(executor.export("SELECT n FROM t", "parquet", row_limit=10))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.read().to_pydict() == {"n": [0, 1, 2, 3, 4]}
+    assert parquet.num_row_groups == 3
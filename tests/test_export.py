@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.config import get_settings
+from app.sql import executor as executor_module
+from app.sql.dbsql import dbsql
+from app.sql.executor import DatabricksExecutor
+from app.sql.pool import PoolUnavailable
+from app.utils import query_store
+
+
+@pytest.fixture(autouse=True)
+def reset_services():
+    yield
+    if hasattr(main.app.state, "services"):
+        del main.app.state.services
+
+
+class FakeCursor:
+    description = [("n",)]
+
+    def __init__(self, rows, error=None) -> None:
+        self.rows = rows
+        self.error = error
+        self.cancelled = threading.Event()
+        self.closed = threading.Event()
+
+    def execute(self, sql_text):
+        if self.error:
+            raise self.error
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchmany_arrow(self, size):
+        import pyarrow as pa
+
+        return pa.table({"n": [row[0] for row in self.fetchmany(size)]})
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        self.closed.set()
+
+
+class FakePool:
+    def __init__(self, cursor) -> None:
+        self.cursor = cursor
+
+    def connection(self):
+        pool = self
+
+        class _Connection:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def cursor(self):
+                return pool.cursor
+
+        return _Connection()
+
+
+def make_executor(cursor, monkeypatch):
+    monkeypatch.setenv("EXPORT_BATCH_ROWS", "2")
+    get_settings.cache_clear()
+    executor = DatabricksExecutor()
+    executor.pool = FakePool(cursor)
+    get_settings.cache_clear()
+    return executor
+
+
+def export_client(executor):
+    main.app.state.services = SimpleNamespace(repair_executor=SimpleNamespace(executor=executor))
+    query_store.set("q-export", {"sql": "SELECT n FROM t", "question": "numbers"})
+    return TestClient(main.app)
+
+
+def test_export_endpoint_streams_attachment(monkeypatch):
+    client = export_client(make_executor(FakeCursor([(i,) for i in range(5)]), monkeypatch))
+    response = client.get("/query/q-export/export")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="query-q-export.csv"'
+    assert response.text.replace('"', "").split() == ["n", "0", "1", "2", "3", "4"]
+
+    assert client.get("/query/unknown/export").status_code == 404
+
+
+def test_export_endpoint_maps_errors_to_status_codes(monkeypatch):
+    monkeypatch.setattr(executor_module, "_HAS_PYARROW", False)
+    client = export_client(make_executor(FakeCursor([(1,)]), monkeypatch))
+    response = client.get("/query/q-export/export?format=parquet")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Parquet export requires pyarrow"
+
+    missing_table = FakeCursor([], error=dbsql.ServerOperationError("TABLE_OR_VIEW_NOT_FOUND"))
+    response = export_client(make_executor(missing_table, monkeypatch)).get("/query/q-export/export")
+    assert (response.status_code, response.json()["detail"]) == (400, "TABLE_OR_VIEW_NOT_FOUND")
+
+    dropped = FakeCursor([], error=dbsql.Error("connection reset"))
+    response = export_client(make_executor(dropped, monkeypatch)).get("/query/q-export/export")
+    assert response.status_code == 502
+
+    exhausted = make_executor(FakeCursor([]), monkeypatch)
+
+    def no_connection():
+        raise PoolUnavailable("Timed out waiting for a Databricks connection")
+
+    exhausted.pool = SimpleNamespace(connection=no_connection)
+    response = export_client(exhausted).get("/query/q-export/export")
+    assert (response.status_code, response.json()["detail"]) == (503, "Timed out waiting for a Databricks connection")
+
+
+def test_export_disconnect_cancels_statement_and_releases_cursor(monkeypatch):
+    cursor = FakeCursor([(i,) for i in range(10)])
+    executor = make_executor(cursor, monkeypatch)
+    query_store.set("q-export", {"sql": "SELECT n FROM t", "question": "numbers"})
+
+    async def disconnect_after_first_chunk():
+        response = await main.export_query("q-export", "csv", None, executor)
+        body = response.body_iterator
+        first = await body.__anext__()
+        # Starlette stops iterating and closes the body when the client goes away.
+        await body.aclose()
+        return first
+
+    assert asyncio.run(disconnect_after_first_chunk())
+    assert cursor.cancelled.is_set()
+    assert cursor.closed.wait(5)
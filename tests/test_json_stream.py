@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.llm.json_stream import JSONObjectExtractor, extract_json
+from app.llm.provider import OpenAIProvider
+
+
+def test_extract_json_ignores_wrapping_text():
+    text = 'Sure! Grouping by {region}:\n```json\n{"sql": "SELECT \'}\' AS x", "fields_used": []}\n```\nDone.'
+    assert extract_json(text) == {"sql": "SELECT '}' AS x", "fields_used": []}
+    with pytest.raises(json.JSONDecodeError):
+        extract_json("I could not answer that.")
+
+
+def test_extractor_returns_when_object_closes():
+    extractor = JSONObjectExtractor()
+    chunks = ['Here: {"sql": "SELECT 1", ', '"nested": {"a": [1, 2]}', "}", " trailing prose {"]
+    results = [extractor.feed(chunk) for chunk in chunks[:3]]
+    assert results[:2] == [None, None]
+    assert results[2] == {"sql": "SELECT 1", "nested": {"a": [1, 2]}}
+
+
+def test_openai_provider_streams_until_object_closes(monkeypatch):
+    get_settings.cache_clear()
+    events = [
+        {"choices": [{"delta": {"content": "The query is "}}]},
+        {"choices": [{"delta": {"content": '{"sql": "SELECT 1",'}}]},
+        {"choices": [{"delta": {"content": ' "fields_used": []}'}}]},
+        {"choices": [{"delta": {"content": " Let me know if"}}]},
+    ]
+    body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    provider = OpenAIProvider()
+    provider._client = httpx.Client(transport=httpx.MockTransport(handler))
+    provider._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    expected = {"sql": "SELECT 1", "fields_used": []}
+    assert provider.complete("question") == expected
+    assert asyncio.run(provider.acomplete("question")) == expected
+    assert all(payload["stream"] is True for payload in seen)
+    get_settings.cache_clear()
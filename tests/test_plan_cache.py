@@ -0,0 +1,49 @@
+from app.llm.plan_cache import HashingEmbedder, PlanCache, normalize_question
+from app.llm.planner import PlanResult
+
+
+def make_plan(sql: str) -> PlanResult:
+    return PlanResult(sql=sql, fields_used=[], assumptions="", tables_considered=[], schema_context="")
+
+
+def test_normalized_form_folds_case_and_punctuation_only():
+    assert normalize_question("  Total spend, by vendor?") == "total spend by vendor"
+    assert normalize_question("total spend by vendor") != normalize_question("Vendor spend totals?")
+
+
+def test_opposite_questions_do_not_share_a_key():
+    pairs = [
+        ("shipments from Boston to Denver", "shipments from Denver to Boston"),
+        ("Is revenue higher than cost", "is cost higher than revenue"),
+    ]
+    cache = PlanCache(ttl_seconds=60, max_entries=10)
+    for first, second in pairs:
+        assert normalize_question(first) != normalize_question(second)
+        cache.set(first, 12, "v1", make_plan(f"SELECT '{first}'"))
+        assert cache.get(second, 12, "v1") is None
+
+
+def test_plan_cache_similarity_and_version_invalidation():
+    cache = PlanCache(ttl_seconds=60, max_entries=10, embedder=HashingEmbedder(), threshold=0.8)
+    plan = make_plan("SELECT vendor, SUM(spend) FROM spend GROUP BY vendor")
+    cache.set("total spend by vendor", 12, "v1", plan)
+    assert cache.get("vendor spend totals", 12, "v1") is plan
+    assert cache.get("what is the total spend for each vendor", 12, "v1") is plan
+    assert cache.get("headcount by region", 12, "v1") is None
+    assert cache.get("total spend by vendor", 5, "v1") is None
+    assert cache.get("total spend by vendor", 12, "v2") is None
+
+
+def test_similarity_lookup_respects_word_order_around_relations():
+    cache = PlanCache(ttl_seconds=60, max_entries=10, embedder=HashingEmbedder(), threshold=0.8)
+    pairs = [
+        ("shipments from Denver to Boston", "shipments from Boston to Denver"),
+        ("cost higher than revenue", "revenue higher than cost"),
+    ]
+    for first, second in pairs:
+        plan = make_plan(f"SELECT '{first}'")
+        cache.set(first, 12, "v1", plan)
+        assert cache.get(second, 12, "v1") is None
+        assert cache.get(f"{first}?", 12, "v1") is plan
+    cache.set("spend from vendors", 12, "v1", make_plan("SELECT spend"))
+    assert cache.get("the spend from vendor", 12, "v1") is not None
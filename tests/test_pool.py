@@ -0,0 +1,118 @@
+import pytest
+
+from app.sql.dbsql import dbsql
+from app.sql.pool import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, connection=None) -> None:
+        self.connection = connection
+
+    def execute(self, sql_text: str):
+        if self.connection is not None:
+            self.connection.probes += 1
+            if not self.connection.alive:
+                raise dbsql.Error("session expired")
+        return None
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        return None
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.open = True
+        self.alive = True
+        self.probes = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.open = False
+
+
+def test_pool_reuses_connections():
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, min_size=0, max_size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+    assert first is second
+    assert len(opened) == 1
+    assert pool.stats() == {"size": 1, "idle": 1, "in_use": 0}
+
+
+def test_pool_replaces_expired_and_closed_connections():
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, min_size=0, max_size=2, max_age_seconds=3600)
+    with pool.connection() as first:
+        first.close()
+    with pool.connection() as second:
+        pass
+    assert second is not first
+
+    pool.max_age_seconds = -1
+    with pool.connection() as third:
+        pass
+    assert third is not second
+    assert pool.stats()["size"] == 0
+
+
+def test_session_pins_one_connection_per_thread():
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, min_size=0, max_size=2)
+    with pool.session():
+        with pool.connection() as first:
+            assert pool.stats()["in_use"] == 1
+        with pool.connection() as second:
+            pass
+        assert pool.stats()["in_use"] == 1
+    assert first is second
+    assert len(opened) == 1
+    assert pool.stats() == {"size": 1, "idle": 1, "in_use": 0}
+
+
+def test_connector_errors_other_than_statement_errors_force_revalidation():
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, min_size=0, max_size=2, validate_after_seconds=3600)
+    with pytest.raises(dbsql.ServerOperationError):
+        with pool.connection():
+            raise dbsql.ServerOperationError("TABLE_OR_VIEW_NOT_FOUND")
+    with pool.connection() as first:
+        pass
+    assert first.probes == 0
+
+    with pytest.raises(dbsql.Error):
+        with pool.connection() as conn:
+            conn.alive = False
+            raise dbsql.Error("connection reset")
+    with pool.connection() as second:
+        pass
+    assert first.probes == 1
+    assert second is not first
+    assert len(opened) == 2
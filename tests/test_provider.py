@@ -0,0 +1,99 @@
+import asyncio
+import importlib.util
+import json
+
+import httpx
+import pytest
+
+from app.config import get_settings
+from app.llm import provider as provider_module
+from app.llm.provider import HTTPLLMProvider, OpenAIProvider, close_provider, get_provider
+
+
+def mock_clients(monkeypatch):
+    """Route every provider client through a MockTransport and record each client created."""
+    created = []
+    sync_client, async_client = httpx.Client, httpx.AsyncClient
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        content = json.dumps({"sql": "SELECT 1", "fields_used": []})
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    def make_sync(**kwargs):
+        created.append(kwargs)
+        client = sync_client(transport=httpx.MockTransport(handler), timeout=kwargs["timeout"])
+        created[-1]["client"] = client
+        return client
+
+    def make_async(**kwargs):
+        created.append(kwargs)
+        client = async_client(transport=httpx.MockTransport(handler), timeout=kwargs["timeout"])
+        created[-1]["client"] = client
+        return client
+
+    monkeypatch.setattr(provider_module.httpx, "Client", make_sync)
+    monkeypatch.setattr(provider_module.httpx, "AsyncClient", make_async)
+    return created
+
+
+def test_provider_keeps_one_client_per_kind_across_calls(monkeypatch):
+    monkeypatch.setenv("LLM_STREAM", "false")
+    get_settings.cache_clear()
+    created = mock_clients(monkeypatch)
+    provider = OpenAIProvider()
+
+    async def ask_twice():
+        return [await provider.acomplete("q1"), await provider.acomplete("q2")]
+
+    assert provider.complete("q1") == provider.complete("q2") == {"sql": "SELECT 1", "fields_used": []}
+    assert asyncio.run(ask_twice())[1] == {"sql": "SELECT 1", "fields_used": []}
+    assert len(created) == 2
+    assert provider.client is created[0]["client"]
+    assert provider.async_client is created[1]["client"]
+    get_settings.cache_clear()
+
+
+def test_close_provider_closes_the_shared_clients(monkeypatch):
+    monkeypatch.setenv("LLM_STREAM", "false")
+    get_settings.cache_clear()
+    get_provider.cache_clear()
+    created = mock_clients(monkeypatch)
+    provider = get_provider()
+    assert get_provider() is provider
+
+    async def use_then_shutdown():
+        provider.complete("q")
+        await provider.acomplete("q")
+        await close_provider()
+
+    asyncio.run(use_then_shutdown())
+    assert [entry["client"].is_closed for entry in created] == [True, True]
+    assert get_provider.cache_info().currsize == 0
+    get_settings.cache_clear()
+
+
+def test_http2_falls_back_without_h2(monkeypatch):
+    monkeypatch.setenv("LLM_HTTP2", "true")
+    get_settings.cache_clear()
+    real_find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        provider_module.importlib.util, "find_spec", lambda name, *args: None if name == "h2" else real_find_spec(name, *args)
+    )
+    created = mock_clients(monkeypatch)
+    provider = OpenAIProvider()
+    assert provider.http2 is False
+    provider.client
+    assert created[0]["http2"] is False
+    get_settings.cache_clear()
+
+
+def test_http_provider_requires_every_hook_at_construction():
+    class NoStreaming(HTTPLLMProvider):
+        def _build_request(self, prompt):
+            return "https://llm.invalid", {}, {}
+
+        def _extract_content(self, data):
+            return ""
+
+    with pytest.raises(TypeError, match="_extract_delta"):
+        NoStreaming()
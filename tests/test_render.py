@@ -0,0 +1,95 @@
+import asyncio
+import base64
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from app.sql.results import ColumnarRows
+from app.viz import draw, render
+from app.viz.pool import RenderError, RenderPool
+
+
+def test_render_reuses_one_cleared_figure():
+    rows = ColumnarRows({"region": ["EMEA", "NA"], "arr": [1.0, 2.0]})
+    image = draw.render_chart("matplotlib", "bar", {"x": "region", "y": "arr"}, rows.columns, "ARR")
+    figure = draw._figure((6, 4))
+    assert base64.b64decode(image).startswith(b"\x89PNG")
+    assert figure.axes == []
+
+    draw.render_chart("matplotlib", "line", {"x": "region", "y": "arr"}, rows.columns, "ARR")
+    assert draw._figure((6, 4)) is figure
+    assert figure.axes == []
+
+
+def test_worker_entry_point_imports_no_service_modules():
+    # Spawned workers import only the module holding ``render_chart`` and ``init_worker``.
+    check = "import sys, app.viz.draw; print(sorted(name for name in sys.modules if name.startswith('app.')))"
+    root = Path(__file__).resolve().parents[1]
+    output = subprocess.run([sys.executable, "-c", check], cwd=root, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "['app.sql', 'app.sql.results', 'app.viz', 'app.viz.draw']"
+
+
+def test_render_pool_times_out_and_replaces_workers():
+    pool = RenderPool(workers=1, timeout=0.5)
+    try:
+        with pytest.raises(RenderError):
+            asyncio.run(pool.run(time.sleep, 30))
+        pool.timeout = 60
+        assert asyncio.run(pool.run(abs, -2)) == 2
+    finally:
+        pool.close()
+
+
+def test_renderer_reuses_cached_image_for_identical_chart(monkeypatch):
+    renderer = render.ChartRenderer()
+    calls = []
+
+    async def fake_run(func, *args):
+        calls.append(args)
+        return f"png-{len(calls)}"
+
+    monkeypatch.setattr(renderer.pool, "run", fake_run)
+    spec = {"x": "region", "y": "arr"}
+    columnar = ColumnarRows({"region": ["EMEA", "NA"], "arr": [1.0, 2.0]})
+    first = asyncio.run(renderer.arender("bar", spec, columnar, title="ARR"))
+    again = asyncio.run(renderer.arender("bar", spec, list(columnar), title="ARR"))
+    changed = asyncio.run(renderer.arender("bar", spec, columnar[:1], title="ARR"))
+    assert (first, again, changed) == ("png-1", "png-1", "png-2")
+    assert len(calls) == 2
+
+
+def test_render_pool_recovers_when_an_idle_worker_dies():
+    pool = RenderPool(workers=1, timeout=60)
+    try:
+        assert asyncio.run(pool.run(abs, -1)) == 1
+        stale = pool._executor
+        for process in list(stale._processes.values()):
+            process.kill()
+            process.join()
+        deadline = time.monotonic() + 10
+        while not stale._broken and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert asyncio.run(pool.run(abs, -2)) == 2
+        assert pool._executor is not stale
+
+        # A failure reported by the old pool must not tear down its replacement.
+        current = pool._executor
+        pool._reset(stale)
+        assert pool._executor is current
+    finally:
+        pool.close()
+
+
+def test_render_cache_key_covers_only_plotted_columns_with_types():
+    spec = {"x": "region", "y": "arr"}
+    base = {"region": ["EMEA"], "arr": [1], "unused": ["a"]}
+    key = render.render_cache_key("matplotlib", "bar", spec, base, "ARR")
+    assert key == render.render_cache_key("matplotlib", "bar", spec, {**base, "unused": ["b"]}, "ARR")
+    assert key != render.render_cache_key("matplotlib", "bar", spec, {**base, "arr": [2]}, "ARR")
+    assert render.render_cache_key("matplotlib", "bar", spec, {**base, "arr": [Decimal("1")]}, "ARR") != (
+        render.render_cache_key("matplotlib", "bar", spec, {**base, "arr": ["1"]}, "ARR")
+    )
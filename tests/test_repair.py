@@ -1,3 +1,5 @@
+import asyncio
+
 from app.llm.planner import PlanResult
 from app.llm.provider import LLMProvider
 from app.sql.repair import SQLRepairExecutor
@@ -20,10 +22,16 @@ class FakeExecutor:
     def __init__(self) -> None:
         self.executed_sql = None
 
-    def execute(self, sql_text: str):
+    def execute(self, sql_text: str, summary=None):
         self.executed_sql = sql_text
         return [{"fixed": 1}]
 
+    def explain(self, sql_text: str):
+        return None
+
+    async def aexecute(self, sql_text: str):
+        return self.execute(sql_text)
+
 
 def test_repair_attempt(monkeypatch):
     calls = {"count": 0}
@@ -35,8 +43,9 @@ def test_repair_attempt(monkeypatch):
         calls["count"] += 1
         return None
 
-    monkeypatch.setattr("app.sql.repair.dry_run", failing_dry_run)
-    executor = SQLRepairExecutor(FakeLLM(), FakeExecutor())
+    sql_executor = FakeExecutor()
+    monkeypatch.setattr(sql_executor, "explain", failing_dry_run)
+    executor = SQLRepairExecutor(FakeLLM(), sql_executor)
     plan = PlanResult(
         sql="SELECT bad FROM table",
         fields_used=["table.bad"],
@@ -48,3 +57,70 @@ def test_repair_attempt(monkeypatch):
     assert sql == "SELECT fixed FROM table"
     assert fields == ["table.fixed"]
     assert rows == [{"fixed": 1}]
+
+
+def test_repair_attempt_async(monkeypatch):
+    attempts = []
+
+    def failing_dry_run(sql_text: str):
+        attempts.append(sql_text)
+        if len(attempts) == 1:
+            raise ValueError("missing column")
+
+    sql_executor = FakeExecutor()
+    monkeypatch.setattr(sql_executor, "explain", failing_dry_run)
+    llm = FakeLLM()
+    executor = SQLRepairExecutor(llm, sql_executor)
+    plan = PlanResult(
+        sql="SELECT bad FROM table",
+        fields_used=["table.bad"],
+        assumptions="",
+        tables_considered=["cat.schema.table"],
+        schema_context="context",
+    )
+    sql, fields, rows = asyncio.run(executor.arun("question", plan))
+    assert sql == "SELECT fixed FROM table"
+    assert attempts == ["SELECT bad FROM table", "SELECT fixed FROM table"]
+    assert llm.calls == 1
+    assert rows == [{"fixed": 1}]
+
+
+class FakeUnityClient:
+    def __init__(self, tables) -> None:
+        self.tables = tables
+
+    def derived(self, name, build):
+        return build(self.tables)
+
+
+def test_hybrid_validation_skips_explain_for_known_tables(monkeypatch):
+    from app.schema.unity import Column, Table
+
+    explained = []
+    sql_executor = FakeExecutor()
+    monkeypatch.setattr(sql_executor, "explain", explained.append)
+    tables = [Table(catalog="main", schema="sales", name="orders", columns=[Column(name="id", type="BIGINT", comment=None)], comment=None)]
+    llm = FakeLLM()
+    executor = SQLRepairExecutor(llm, sql_executor, FakeUnityClient(tables))
+    plan = PlanResult(
+        sql="SELECT id FROM main.sales.orders",
+        fields_used=["orders.id"],
+        assumptions="",
+        tables_considered=["main.sales.orders"],
+        schema_context="context",
+    )
+    executor.run("question", plan)
+    assert explained == [] and llm.calls == 0
+
+    plan = PlanResult(
+        sql="SELECT id FROM main.sales.order",
+        fields_used=["orders.id"],
+        assumptions="",
+        tables_considered=["main.sales.orders"],
+        schema_context="context",
+    )
+    sql, _, _ = executor.run("question", plan)
+    assert sql == "SELECT fixed FROM table"
+    assert llm.calls == 1
+    # The repaired SQL references an unknown, unqualified table, so it falls back to EXPLAIN.
+    assert explained == ["SELECT fixed FROM table"]
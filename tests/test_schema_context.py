@@ -0,0 +1,180 @@
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.schema import serialize
+from app.schema.index import MetadataIndex
+from app.schema.ranking import TableRanker
+from app.schema.relationships import RelationshipGraph
+from app.schema.resolver import surface_relevant_columns
+from app.schema.serialize import choose_encoding
+from app.schema.unity import Column, Table, build_condensed_context, metadata_version
+
+
+def make_tables():
+    return [
+        Table(
+            catalog="main",
+            schema="ops",
+            name="tickets",
+            columns=[Column(name="id", type="BIGINT", comment=None), Column(name="status", type="STRING", comment=None)],
+            comment="support tickets",
+        ),
+        Table(
+            catalog="main",
+            schema="finance",
+            name="order_items",
+            columns=[
+                Column(name="order_id", type="BIGINT", comment=None),
+                Column(name="revenue", type="DOUBLE", comment="net revenue per line"),
+            ],
+            comment=None,
+        ),
+    ]
+
+
+def test_condensed_context_ranks_matching_tables_first():
+    context = build_condensed_context(make_tables(), "Total revenue from order items", top_k_tables=1)
+    assert context["tables"] == ["main.finance.order_items"]
+    assert "- revenue (DOUBLE): net revenue per line" in context["text"]
+
+
+def test_surface_relevant_columns_matches_whole_identifiers():
+    columns = surface_relevant_columns("revenue by order_id for paid tickets", make_tables())
+    assert columns == [("main.finance.order_items", "order_id"), ("main.finance.order_items", "revenue")]
+
+
+def test_ranker_uses_comments_and_synonyms():
+    tables = make_tables() + [
+        Table(
+            catalog="finance",
+            schema="revenue",
+            name="annual_recurring_revenue",
+            columns=[Column(name="region", type="STRING", comment=None)],
+            comment=None,
+        )
+    ]
+    ranker = TableRanker(tables)
+    assert ranker.top_tables("open support issues", 1)[0].name == "tickets"
+    assert ranker.top_tables("ARR by region", 1, synonyms={"arr": "finance.revenue.annual_recurring_revenue"})[0].name == (
+        "annual_recurring_revenue"
+    )
+
+
+def test_relationship_graph_validates_targets_and_finds_join_paths():
+    tables = [
+        Table(catalog="main", schema="sales", name="orders", columns=[
+            Column(name="id", type="BIGINT", comment=None),
+            Column(name="customer_id", type="BIGINT", comment=None),
+            Column(name="warehouse_id", type="BIGINT", comment=None),
+        ], comment=None),
+        Table(catalog="main", schema="sales", name="customers", columns=[
+            Column(name="id", type="BIGINT", comment=None),
+            Column(name="region_id", type="BIGINT", comment=None),
+        ], comment=None),
+        Table(catalog="main", schema="geo", name="regions", columns=[Column(name="id", type="BIGINT", comment=None)], comment=None),
+    ]
+    graph = RelationshipGraph(tables)
+    assert graph.pk_fk(tables[0])["fk"] == ["customer_id->main.sales.customers(id)"]
+    path = graph.join_path("main.sales.orders", "main.geo.regions")
+    assert [edge.condition() for edge in path] == [
+        "main.sales.orders.customer_id = main.sales.customers.id",
+        "main.sales.customers.region_id = main.geo.regions.id",
+    ]
+    context = build_condensed_context(tables, "orders by customer", top_k_tables=2, relationships=graph)
+    assert "Joins: main.sales.orders.customer_id = main.sales.customers.id" in context["text"]
+
+
+class FakeUnityClient:
+    def __init__(self, tables):
+        self.tables = tables
+        self.snapshots = 0
+
+    def snapshot(self):
+        self.snapshots += 1
+        return self.tables, metadata_version(self.tables), RelationshipGraph(self.tables)
+
+
+def schema_client(tables):
+    from app.main import app
+
+    app.state.services = SimpleNamespace(unity_client=FakeUnityClient(tables))
+    return TestClient(app)
+
+
+def test_schema_endpoint_etag_encoding_and_paging():
+    client = schema_client(make_tables())
+    response = client.get("/schema", headers={"accept-encoding": "identity"})
+    assert response.status_code == 200
+    assert [table["full_name"] for table in response.json()["tables"]] == ["main.ops.tickets", "main.finance.order_items"]
+    assert response.json()["total"] == 2
+
+    etag = response.headers["etag"]
+    identity = {"accept-encoding": "identity", "if-none-match": etag}
+    assert client.get("/schema", headers=identity).status_code == 304
+    assert client.get("/schema?schema=ops", headers=identity).status_code == 200
+
+    compressed = client.get("/schema", headers={"accept-encoding": "gzip, br;q=0.5", "if-none-match": etag})
+    assert compressed.status_code == 200
+    assert compressed.headers["content-encoding"] == ("br" if serialize._HAS_BROTLI else "gzip")
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert compressed.headers["etag"] != etag
+    assert compressed.json() == response.json()
+    assert choose_encoding("deflate") == "identity"
+
+    filtered = client.get("/schema?catalog=main&schema=finance").json()
+    assert [table["full_name"] for table in filtered["tables"]] == ["main.finance.order_items"]
+    assert filtered["total"] == 1
+    page = client.get("/schema?offset=1&limit=1").json()
+    assert [table["full_name"] for table in page["tables"]] == ["main.finance.order_items"]
+    assert page["total"] == 2
+
+
+def test_stale_snapshot_cannot_swap_fragments_under_a_newer_document():
+    old_tables, new_tables = make_tables()[:1], make_tables()
+    old = (metadata_version(old_tables), old_tables, RelationshipGraph(old_tables))
+    new = (metadata_version(new_tables), new_tables, RelationshipGraph(new_tables))
+    serializer = serialize.SchemaSerializer(ttl_seconds=60)
+    real_ensure = serializer._ensure_fragments
+
+    def interleaved(version, tables, relationships):
+        built = real_ensure(version, tables, relationships)
+        if version == new[0]:
+            # A request still holding the older snapshot runs between the two steps.
+            list(serializer.ndjson(*old))
+        return built
+
+    serializer._ensure_fragments = interleaved
+    document = serializer.document(*new, synonyms={})
+    assert json.loads(document.body)["total"] == 2
+    assert [table["full_name"] for table in json.loads(document.body)["tables"]] == [
+        table.full_name for table in new_tables
+    ]
+
+
+def test_schema_endpoint_streams_ndjson():
+    client = schema_client(make_tables())
+    response = client.get("/schema?format=ndjson&limit=1")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert [json.loads(line)["full_name"] for line in lines] == ["main.ops.tickets"]
+    assert response.headers["etag"] != client.get("/schema?limit=1").headers["etag"]
+
+
+def test_index_folds_plurals_on_both_sides():
+    tables = [
+        Table(
+            catalog="main",
+            schema="ops",
+            name="ticket",
+            columns=[Column(name="priority", type="STRING", comment=None), Column(name="sub_categories", type="STRING", comment=None)],
+            comment=None,
+        )
+    ]
+    index = MetadataIndex(tables)
+    assert "ticket" in index._matched_keys("open tickets")
+    assert surface_relevant_columns("ticket priorities by sub category", tables, index) == [
+        ("main.ops.ticket", "priority"),
+        ("main.ops.ticket", "sub_categories"),
+    ]
@@ -1,3 +1,4 @@
+from app.sql.results import ColumnarRows
 from app.viz.selector import select_chart
 
 
@@ -21,3 +22,8 @@ def test_kpi_when_single_numeric():
     chart_type, spec = chart
     assert chart_type == "kpi"
     assert spec["x"] == "total"
+
+
+def test_columnar_rows_select_same_chart():
+    rows = ColumnarRows({"region": ["EMEA", "NA"], "arr": [1.0, 2.0]})
+    assert select_chart(rows) == select_chart(list(rows)) == ("bar", {"x": "region", "y": "arr"})
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app import main
+from app.llm.planner import PlanResult
+from app.models import AskRequest
+from app.sql.results import QueryRows
+from app.utils import format_sse
+
+
+class FakePlanner:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def abuild_plan(self, question, top_k):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return PlanResult(sql="SELECT region, arr FROM t", fields_used=[], assumptions="", tables_considered=["t"], schema_context="")
+
+    def remember(self, *args):
+        return None
+
+
+class FakeRepair:
+    def __init__(self, error=None) -> None:
+        self.error = error
+
+    async def arun(self, question, plan):
+        if self.error:
+            raise self.error
+        return plan.sql, ["t.arr"], QueryRows([{"region": "EMEA", "arr": 1.0}, {"region": "NA", "arr": 2.0}])
+
+
+class FakeRenderer:
+    async def arender(self, chart_type, spec, rows, title):
+        return "png"
+
+
+def parse_events(chunks):
+    events = []
+    for chunk in chunks:
+        event, data = chunk.strip().split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def stream(request, planner, repair):
+    async def collect():
+        stages = main._coalesced_stages(
+            request, SimpleNamespace(headers={}), planner, repair, FakeRenderer(), json.dumps(request.dict(), sort_keys=True)
+        )
+        return [chunk async for chunk in main._sse_events(stages, cached=False)]
+
+    return collect()
+
+
+def test_format_sse_writes_one_json_data_line():
+    assert format_sse("rows", {"n": 1, "text": "a\nb"}) == 'event: rows\ndata: {"n": 1, "text": "a\\nb"}\n\n'
+
+
+def test_format_sse_encodes_values_like_ask_responses():
+    row = {"arr": Decimal("12.50"), "at": datetime(2024, 1, 2, 3, 4, 5)}
+    assert format_sse("rows", row) == 'event: rows\ndata: {"arr": 12.5, "at": "2024-01-02T03:04:05"}\n\n'
+
+
+def test_stream_emits_stages_in_order():
+    events = parse_events(asyncio.run(stream(AskRequest(question="stream order"), FakePlanner(), FakeRepair())))
+    assert [event for event, _ in events] == ["plan", "rows", "result", "chart", "done"]
+    assert events[1][1]["row_count"] == 2
+    assert events[3][1]["image_base64"] == "png"
+    assert events[4][1] == {"cached": False}
+
+
+def test_stream_reports_errors_in_band():
+    repair = FakeRepair(RuntimeError("bad sql"))
+    events = parse_events(asyncio.run(stream(AskRequest(question="stream error"), FakePlanner(), repair)))
+    assert events == [
+        ("plan", {"sql": "SELECT region, arr FROM t", "tables_considered": ["t"], "assumptions": ""}),
+        ("error", {"status_code": 400, "detail": "bad sql"}),
+    ]
+
+
+def test_identical_concurrent_streams_run_the_pipeline_once():
+    planner = FakePlanner()
+    request = AskRequest(question="stream coalesce")
+
+    async def both():
+        return await asyncio.gather(stream(request, planner, FakeRepair()), stream(request, planner, FakeRepair()))
+
+    first, second = (parse_events(chunks) for chunks in asyncio.run(both()))
+    assert planner.calls == 1
+    assert [event for event, _ in first] == [event for event, _ in second] == ["plan", "rows", "result", "chart", "done"]
+    assert first[2][1]["sampled_rows"] == second[2][1]["sampled_rows"]
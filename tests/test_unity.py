@@ -0,0 +1,92 @@
+from datetime import datetime
+
+from app.schema.unity import Column, Table, UnityCatalogClient
+
+
+def make_table(name: str, *columns: str) -> Table:
+    return Table(
+        catalog="main",
+        schema="sales",
+        name=name,
+        columns=[Column(name=column, type="STRING", comment=None) for column in columns],
+        comment=None,
+    )
+
+
+def test_incremental_refresh_merges_changes_and_bumps_version(monkeypatch):
+    client = UnityCatalogClient()
+    loads = []
+
+    def fake_load(since=None):
+        loads.append(since)
+        if since is None:
+            return [make_table("orders", "id"), make_table("customers", "id")], datetime(2024, 1, 1)
+        return [make_table("orders", "id", "amount")], datetime(2024, 2, 1)
+
+    monkeypatch.setattr(client, "_load_metadata", fake_load)
+    monkeypatch.setattr(client, "_load_table_names", lambda: {"main.sales.orders"})
+
+    assert [table.name for table in client.get_tables()] == ["customers", "orders"]
+    first_version = client.version
+    index = client.get_index()
+
+    client.refresh()
+    assert loads == [None, datetime(2024, 1, 1)]
+    assert [table.name for table in client.get_tables()] == ["orders"]
+    assert [column.name for column in client.get_tables()[0].columns] == ["id", "amount"]
+    assert client.version != first_version
+    assert client.watermark == datetime(2024, 2, 1)
+    assert client.get_index() is not index
+
+
+def test_snapshot_restores_metadata_without_loading(monkeypatch, tmp_path):
+    path = str(tmp_path / "metadata.snapshot")
+    monkeypatch.setattr(
+        UnityCatalogClient,
+        "_load_metadata",
+        lambda self, since=None: ([make_table("orders", "id", "amount")], datetime(2024, 1, 1)),
+    )
+    writer = UnityCatalogClient()
+    writer.snapshot_path = path
+    writer.refresh()
+
+    reader = UnityCatalogClient()
+    reader.snapshot_path = path
+    reader._restore_snapshot()
+    assert reader.status()["loaded_from"] == "snapshot"
+    assert reader.version == writer.version
+    assert reader.watermark == datetime(2024, 1, 1)
+    assert reader.get_tables()[0].full_name == "main.sales.orders"
+    assert reader.get_index().column_names["amount"] == [(0, 1)]
+
+
+def test_warm_up_loads_metadata_and_reports_status(monkeypatch):
+    client = UnityCatalogClient()
+    monkeypatch.setattr(client, "_load_metadata", lambda since=None: ([make_table("orders", "id")], None))
+    assert client.status()["loaded"] is False
+
+    client.warm_up()
+    status = client.status()
+    assert status["loaded"] and status["tables"] == 1
+    assert status["version"] == client.version
+    assert status["loaded_from"] == "warehouse" and status["load_seconds"] is not None
+
+
+def test_schema_snapshot_pairs_tables_version_and_relationships(monkeypatch):
+    client = UnityCatalogClient()
+    monkeypatch.setattr(client, "_load_metadata", lambda since=None: ([make_table("orders", "id")], None))
+    tables, version, _ = client.snapshot()
+
+    original_current = client._current
+
+    def current_then_refresh():
+        state = original_current()
+        # A background refresh publishes new metadata right after the read.
+        client._publish([make_table("orders", "id"), make_table("customers", "id")], None)
+        return state
+
+    monkeypatch.setattr(client, "_current", current_then_refresh)
+    stale_tables, stale_version, relationships = client.snapshot()
+    assert (stale_tables, stale_version) == (tables, version)
+    assert set(relationships.primary_keys) == {"main.sales.orders"}
+    assert client.version != version
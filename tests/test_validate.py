@@ -0,0 +1,41 @@
+import pytest
+
+from app.sql.validate import ensure_select_only, limit_sql
+
+
+def test_keywords_in_literals_comments_and_columns_are_allowed():
+    summary = ensure_select_only(
+        "SELECT t.update, 'DROP TABLE x' AS note, `create` -- DELETE everything\n"
+        "FROM main.ops.tickets t JOIN main.ops.users u ON t.user_id = u.id /* ALTER */ LIMIT 50;"
+    )
+    assert summary.tables == ("main.ops.tickets", "main.ops.users")
+    assert summary.has_limit and summary.limit == 50
+
+
+def test_summary_ignores_ctes_and_nested_limits():
+    summary = ensure_select_only("WITH recent AS (SELECT * FROM main.ops.tickets LIMIT 5) SELECT * FROM recent")
+    assert summary.tables == ("main.ops.tickets",)
+    assert not summary.has_limit
+
+
+@pytest.mark.parametrize(
+    "sql_text, message",
+    [
+        ("DELETE FROM main.ops.tickets", "Only SELECT statements are allowed"),
+        ("SELECT 1; DROP TABLE main.ops.tickets", "Multiple statements are not allowed"),
+        ("WITH x AS (SELECT 1) INSERT INTO main.ops.tickets SELECT * FROM x", "Forbidden keyword detected: INSERT"),
+        ("SELECT 'unterminated FROM main.ops.tickets", "Unterminated string literal, identifier, or comment"),
+    ],
+)
+def test_rejects_unsafe_statements(sql_text, message):
+    with pytest.raises(ValueError, match=message):
+        ensure_select_only(sql_text)
+
+
+def test_limit_sql_appends_or_wraps_limits():
+    def limited(sql_text):
+        return limit_sql(sql_text, ensure_select_only(sql_text), 501)
+
+    assert limited("SELECT * FROM t -- all rows;") == "SELECT * FROM t\nLIMIT 501"
+    assert limited("SELECT * FROM t LIMIT 10;") == "SELECT * FROM t LIMIT 10;"
+    assert limited("SELECT * FROM t LIMIT 5000") == "SELECT * FROM (\nSELECT * FROM t LIMIT 5000\n) AS _limited\nLIMIT 501"